@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import json
+import time
+import aiohttp
+from response_cache import make_key
+
+
+class AsyncCrawlEngine:
+    """
+    Asyncio request engine for AutocompleteAPIExtractor.
+
+    Keeps a bounded pool of keep-alive connections and a fixed set of workers
+    fed from one shared queue, so a slow request only occupies its own worker
+    instead of holding back a whole batch. With refresh=True every prefix is
+    fetched from the network; responses are still written to the cache.
+    params are extra query parameters sent with every request.
+
+    Requests use the extractor's connect/read timeouts and stop at its crawl
+    deadline. With the extractor's hedge_requests on, a request still running
+    after the version's p95 latency gets a duplicate, which waits for a rate
+    token like any request; whichever answers first is used and the other is
+    cancelled.
+    """
+    def __init__(self, extractor, concurrency=5, refresh=False, params=None):
+        self.extractor = extractor
+        self.concurrency = concurrency
+        self.refresh = refresh
+        self.params = params or {}
+
+    def _make_session(self):
+        """Create a session whose connector caps the number of open connections"""
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        return aiohttp.ClientSession(connector=connector)
+
+    async def fetch(self, session, version, query, params=None):
+        """
+        Async counterpart of make_request with the same retry logic, rate limiting,
+        caching and coalescing of identical in-flight requests
+        """
+        params = {**self.params, **(params or {})} or None
+        cache = self.extractor.cache
+        if cache is not None and not self.refresh:
+            cached = cache.get(self.extractor.base_url, version, query, params)
+            if cached is not None:
+                return cached
+
+        key = (version, make_key(self.extractor.base_url, version, query, params))
+        return await self.extractor.single_flight.do_async(key, lambda: self._fetch(session, version, query, params))
+
+    async def _fetch(self, session, version, query, params=None):
+        """The network part of fetch"""
+        cache = self.extractor.cache
+        url = f"{self.extractor.base_url}/{version}/autocomplete"
+
+        limiter = self.extractor.rate_limiter
+        metrics = self.extractor.metrics
+        for attempt in range(self.extractor.max_retries):
+            if self.extractor.expired(version):
+                return None  # Not [], which would read as a prefix without names
+            if attempt:
+                metrics.record_retry(version)
+            try:
+                await limiter.acquire_async(version)
+                start = time.perf_counter()
+                status, body, headers = await self._hedged_get(session, version, url, {"query": query, **(params or {})})
+                metrics.record_request(version, time.perf_counter() - start, status, len(body))
+
+                if status == 200:
+                    limiter.on_success(version)
+                    data = json.loads(body)
+                    if cache is not None:
+                        cache.put(self.extractor.base_url, version, query, data, params)
+                    return data
+                elif status == 429:  # Too Many Requests
+                    print(f"Rate limited on '{query}'. Backing off before retry.")
+                    limiter.on_throttle(version, headers.get("Retry-After"))
+                else:
+                    print(f"Error: Status code {status} for query '{query}'")
+                    return []
+
+            except asyncio.TimeoutError:
+                metrics.record_timeout(version)
+                print(f"Request timed out for '{query}'")
+            except aiohttp.ClientError as e:
+                metrics.record_error(version)
+                print(f"Request error for '{query}': {e}")
+
+        print(f"Max retries exceeded for query '{query}'")
+        return []
+
+    async def _get(self, session, version, url, params):
+        """One GET within the extractor's timeouts; returns (status, body, headers)"""
+        connect, read = self.extractor.timeout()
+        remaining = self.extractor.remaining()
+        total = None if remaining is None else max(remaining, 0.001)  # The crawl deadline bounds the whole request
+        timeout = aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=read)
+        self.extractor.request_count[version] += 1
+        async with session.get(url, params=params, timeout=timeout) as response:
+            return response.status, await response.read(), response.headers
+
+    async def _hedged_get(self, session, version, url, params):
+        """_get, plus a duplicate if it runs past the hedge delay; the first to answer wins"""
+        delay = self.extractor.hedge_delay(version)
+        if delay is None:
+            return await self._get(session, version, url, params)
+
+        primary = asyncio.ensure_future(self._get(session, version, url, params))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if not done:
+            await self.extractor.rate_limiter.acquire_async(version)  # The hedge spends rate budget too
+        if primary.done():
+            return primary.result()
+
+        hedge = asyncio.ensure_future(self._get(session, version, url, params))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.extractor.metrics.record_hedge(version, won=task is hedge)
+                        return task.result()
+            self.extractor.metrics.record_hedge(version, won=False)
+            return primary.result()  # Both failed: raise the original's error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def crawl(self, version, seeds, on_result, skip=None, priority=None, on_drain=None):
+        """
+        Query every prefix in seeds, plus any prefixes returned by
+        on_result(prefix, results), until the work queue drains. A prefix may
+        also be a (prefix, params) pair, to send extra query parameters with
+        that request; on_result, skip and priority get it as queued.
+        skip(prefix) is checked when a prefix is dequeued, so it can use
+        everything learned since the prefix was queued.
+        With priority(prefix), the frontier is a priority queue and the prefix
+        with the highest priority at the time it was queued is fetched first;
+        otherwise prefixes are fetched in FIFO order.
+        on_drain() is called whenever the queue drains and may return more
+        prefixes to queue, such as ones skip passed over that now look worth
+        fetching; the crawl ends once it returns none.
+        Network and malformed-response errors skip the prefix; an error raised
+        by on_result, skip, priority or on_drain stops the crawl and is
+        raised from crawl().
+        Once the extractor's crawl deadline passes, the queue is drained
+        without sending requests, and prefixes cut off by it are not passed
+        to on_result, so a checkpoint leaves them to a resumed crawl.
+        """
+        if priority is None:
+            queue = asyncio.Queue()
+            put = queue.put_nowait
+        else:
+            queue = asyncio.PriorityQueue()
+            order = itertools.count()  # Ties keep FIFO order and never compare prefixes
+            put = lambda prefix: queue.put_nowait((-priority(prefix), next(order), prefix))
+        for prefix in seeds:
+            put(prefix)
+
+        unvisited = 0
+
+        async def worker(session):
+            nonlocal unvisited
+            while True:
+                prefix = await queue.get()
+                if priority is not None:
+                    prefix = prefix[2]
+                try:
+                    if self.extractor.expired(version):
+                        unvisited += 1
+                        continue
+                    if skip is not None and skip(prefix):
+                        continue
+                    try:
+                        if isinstance(prefix, tuple):
+                            results = await self.fetch(session, version, *prefix)
+                        else:
+                            results = await self.fetch(session, version, prefix)
+                    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                        print(f"Error fetching prefix '{prefix}': {e}")
+                        continue
+                    if results is None:
+                        unvisited += 1
+                        continue
+                    for child in on_result(prefix, results) or ():
+                        put(child)
+                    self.extractor.metrics.record_queue_depth(version, queue.qsize())
+                finally:
+                    queue.task_done()
+
+        async with self._make_session() as session:
+            workers = [asyncio.create_task(worker(session)) for _ in range(self.concurrency)]
+            try:
+                await self._join(queue, workers)
+                while on_drain is not None and not self.extractor.expired(version):
+                    more = on_drain()
+                    if not more:
+                        break
+                    for prefix in more:
+                        put(prefix)
+                    await self._join(queue, workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        if unvisited:
+            print(f"Crawl deadline reached with {unvisited} prefixes unvisited")
+
+    @staticmethod
+    async def _join(queue, workers):
+        """Wait for the queue to drain; a worker only stops by raising, so re-raise its error"""
+        drained = asyncio.ensure_future(queue.join())
+        done, _ = await asyncio.wait([drained, *workers], return_when=asyncio.FIRST_COMPLETED)
+        if drained not in done:
+            drained.cancel()
+            for task in done:
+                task.result()
+
+    def run(self, version, seeds, on_result, skip=None, priority=None, on_drain=None):
+        """Run a crawl to completion from synchronous code"""
+        return asyncio.run(self.crawl(version, seeds, on_result, skip, priority, on_drain))
@@ -0,0 +1,136 @@
+import argparse
+import io
+import json
+import string
+import time
+from contextlib import redirect_stdout
+
+from extractor import AutocompleteAPIExtractor
+from mock_server import MockAutocompleteServer, generate_corpus
+from rate_limiter import RateLimiter
+
+# Strategy name -> callable(extractor, version, budget) returning the names found;
+# budget (a request limit) only applies to the budgeted strategies
+STRATEGIES = {
+    "bfs": lambda extractor, version, budget: extractor.bfs_approach(version),
+    "optimized": lambda extractor, version, budget: extractor.optimized_approach(version),
+    "parallel": lambda extractor, version, budget: extractor.parallel_extraction(version, prefix_length=2),
+    "saturation": lambda extractor, version, budget: extractor.saturation_approach(version),
+    "prioritized": lambda extractor, version, budget: extractor.prioritized_approach(version, max_requests=budget),
+    "fifo": lambda extractor, version, budget: extractor.prioritized_approach(version, max_requests=budget, prioritize=False),
+    "planned": lambda extractor, version, budget: extractor.planned_approach(version),
+}
+
+
+def run_strategy(strategy, corpus, version="v1", rate=200.0, verbose=False, budget=None, hedge=False,
+                 read_timeout=None, **server_options):
+    """
+    Run one strategy against a fresh mock server and report requests issued,
+    names recovered, recall against the server's corpus, wall time and throughput.
+    hedge and read_timeout set the extractor's hedge_requests and read_timeout.
+    """
+    with MockAutocompleteServer(corpus, **server_options) as server:
+        extractor = AutocompleteAPIExtractor(server.base_url, rate_limiter=RateLimiter(initial_rate=rate), cache=False)
+        extractor.hedge_requests = hedge
+        if read_timeout:
+            extractor.read_timeout = read_timeout
+        output = None if verbose else io.StringIO()
+        start = time.perf_counter()
+        if output is None:
+            names = STRATEGIES[strategy](extractor, version, budget)
+        else:
+            with redirect_stdout(output):
+                names = STRATEGIES[strategy](extractor, version, budget)
+        elapsed = time.perf_counter() - start
+
+        stats = extractor.metrics.snapshot()["versions"].get(version, {})
+        latency = stats.get("latency", {})
+        truth = set(server.corpora[version])
+        requests_issued = server.request_count[version]
+        throttled = server.throttled_count[version]
+
+    found = set(names) & truth
+    return {
+        "strategy": strategy,
+        "version": version,
+        "requests": requests_issued,
+        "throttled": throttled,
+        "names": len(found),
+        "ground_truth": len(truth),
+        "recall": len(found) / len(truth) if truth else 1.0,
+        "wall_time": elapsed,
+        "requests_per_second": requests_issued / elapsed if elapsed else 0.0,
+        "names_per_second": len(found) / elapsed if elapsed else 0.0,
+        "names_per_request": len(found) / requests_issued if requests_issued else 0.0,
+        "p50_latency": latency.get("p50", 0.0),
+        "p95_latency": latency.get("p95", 0.0),
+        "p99_latency": latency.get("p99", 0.0),
+        "max_latency": latency.get("max", 0.0),
+        "timeouts": stats.get("timeouts", 0),
+        "hedges": stats.get("hedges", 0),
+        "hedges_won": stats.get("hedges_won", 0),
+    }
+
+
+def print_report(rows):
+    header = f"{'strategy':<12}{'requests':>10}{'429s':>7}{'names':>8}{'recall':>8}{'time (s)':>10}{'req/s':>8}{'names/s':>9}{'names/req':>10}{'p95 (ms)':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['strategy']:<12}{row['requests']:>10}{row['throttled']:>7}{row['names']:>8}"
+              f"{row['recall']:>8.1%}{row['wall_time']:>10.2f}{row['requests_per_second']:>8.1f}"
+              f"{row['names_per_second']:>9.1f}{row['names_per_request']:>10.2f}{row['p95_latency'] * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark extraction strategies against the mock server")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--version", default="v1", choices=["v1", "v2", "v3"])
+    parser.add_argument("--names", type=int, default=2000, help="Size of the generated corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--alphabet", default=string.ascii_lowercase, help="Characters used in generated names")
+    parser.add_argument("--cap", type=int, default=20, help="Server result cap for the version")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--rps", type=float, help="Server rate limit in requests/second")
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--ordering", choices=["sorted", "shuffled"], default="sorted")
+    parser.add_argument("--max-limit", type=int, help="Server honours a `limit` parameter up to this page size")
+    parser.add_argument("--offset", action="store_true", help="Server honours an `offset` parameter")
+    parser.add_argument("--page", action="store_true", help="Server honours a 1-based `page` parameter")
+    parser.add_argument("--bulk", action="store_true", help="Server serves every name at /{version}/names")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="Fraction of server requests that stall")
+    parser.add_argument("--slow-seconds", type=float, default=5.0, help="Extra seconds a stalled request takes")
+    parser.add_argument("--hedge", action="store_true", help="Hedge async requests that run past the p95 latency")
+    parser.add_argument("--read-timeout", type=float, help="Client read timeout in seconds")
+    parser.add_argument("--rate", type=float, default=200.0, help="Initial client rate in requests/second")
+    parser.add_argument("--budget", type=int, help="Request budget for the prioritized and fifo strategies")
+    parser.add_argument("--verbose", action="store_true", help="Show strategy progress output")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.names, args.seed, args.alphabet)
+    paging = {"max_limit": args.max_limit, "offset": args.offset, "page": args.page}
+    server_options = {
+        "result_caps": {args.version: args.cap},
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "rate_limits": {args.version: (args.rps, args.burst)} if args.rps else None,
+        "ordering": args.ordering,
+        "seed": args.seed,
+        "paging": {args.version: paging} if any(paging.values()) else None,
+        "bulk_paths": {args.version: f"/{args.version}/names"} if args.bulk else None,
+        "slow": (args.slow_fraction, args.slow_seconds) if args.slow_fraction else None,
+    }
+
+    rows = []
+    for strategy in args.strategies:
+        print(f"Running {strategy}...")
+        rows.append(run_strategy(strategy, corpus, args.version, args.rate, args.verbose, args.budget, args.hedge,
+                                 args.read_timeout, **server_options))
+
+    print()
+    print_report(rows)
+    with open(args.output, "w") as f:
+        json.dump(rows, f, indent=2)
+    print(f"\nSaved benchmark results to {args.output}")
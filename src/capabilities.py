@@ -0,0 +1,135 @@
+import json
+
+DEFAULT_CAPABILITIES_PATH = "capabilities.json"
+
+SIZE_PARAMS = ("limit", "max", "count", "size", "per_page")  # May change how many names come back
+OFFSET_PARAMS = ("offset", "start", "skip")  # May shift the window of names returned
+PAGE_PARAMS = ("page",)
+BULK_PATHS = (  # Dump-style endpoints that may return every name at once
+    "/{version}/autocomplete/all",
+    "/{version}/names/all",
+    "/{version}/autocomplete/dump",
+    "/{version}/dump",
+    "/{version}/names",
+)
+
+
+class CapabilityProbe:
+    """
+    Finds which page parameters and bulk endpoints a version honours, for
+    AutocompleteAPIExtractor.
+
+    Each candidate parameter is sent with one query and the response compared
+    with the plain one: a size parameter must return more names, an offset or
+    page parameter must return the names that follow. Autocomplete requests go
+    through the extractor's rate limiter and response cache, so probing again
+    is cheap. The cheapest retrieval plan is chosen from what works (see
+    choose_plan).
+    """
+    def __init__(self, extractor, query="a", requested_size=1000):
+        self.extractor = extractor
+        self.query = query
+        self.requested_size = requested_size  # Page size asked for when testing size parameters
+
+    def probe(self, version):
+        """Test every candidate on version and return its capabilities, including the chosen plan"""
+        print(f"\nProbing page parameters and bulk endpoints of {version}...")
+        get = lambda params=None: self.extractor.make_request(version, self.query, params) or []
+        start_count = self.extractor.request_count[version]
+        baseline = get()
+        cap = len(baseline)
+        params = {}
+
+        size_param, page_size = None, cap
+        for name in SIZE_PARAMS:
+            results = get({name: self.requested_size})
+            if len(results) > cap:
+                params[name] = {"size": True, "window": False, "page_size": len(results)}
+                if len(results) > page_size:
+                    size_param, page_size = name, len(results)
+            elif cap > 1 and len(get({name: cap // 2})) == cap // 2:
+                params[name] = {"size": True, "window": False, "page_size": cap}  # Can only shrink pages
+
+        offset_param = None
+        shift = cap // 2
+        for name in OFFSET_PARAMS:
+            results = get({name: shift}) if shift else []
+            works = bool(results) and results != baseline and results[:cap - shift] == baseline[shift:]
+            params[name] = {"size": False, "window": works}
+            if works and offset_param is None:
+                offset_param = name
+
+        page_param, first_page = None, None
+        seen = set(baseline)
+        for name in PAGE_PARAMS:
+            for first in (0, 1):
+                results = get({name: first + 1})  # The second page, if pages start at first
+                if results and not seen & set(results):
+                    page_param, first_page = name, first
+                    break
+            params[name] = {"size": False, "window": page_param == name}
+
+        bulk_path = None
+        for path in BULK_PATHS:
+            names = self.extractor.fetch_bulk(version, path.format(version=version))
+            if names is not None and len(names) > cap:
+                bulk_path = path.format(version=version)
+                break
+
+        capabilities = {
+            "result_cap": cap,
+            "params": params,
+            "size_param": size_param,
+            "page_size": page_size,
+            "requested_size": self.requested_size if size_param else None,
+            "offset_param": offset_param,
+            "page_param": page_param,
+            "first_page": first_page,
+            "bulk_path": bulk_path,
+            "probe_requests": self.extractor.request_count[version] - start_count,
+        }
+        capabilities["plan"] = choose_plan(capabilities)
+        print(f"{version}: size parameter {size_param} (page of {page_size}), offset parameter {offset_param}, "
+              f"page parameter {page_param}, bulk endpoint {bulk_path}; plan: {capabilities['plan']['strategy']}")
+        return capabilities
+
+    def run(self, versions, path=DEFAULT_CAPABILITIES_PATH):
+        """Probe versions and save their capabilities"""
+        capabilities = {version: self.probe(version) for version in versions}
+        save_capabilities(capabilities, path)
+        print(f"\nSaved capabilities to {path}")
+        return capabilities
+
+
+def choose_plan(capabilities):
+    """
+    The cheapest way to retrieve every name, given a version's capabilities:
+    one bulk request; else paging through each prefix with an offset or page
+    parameter (about one request per page of names); else the prefix crawl,
+    with the largest page size accepted, so fewer prefixes saturate.
+    The size parameter asks for the probe's requested size rather than the
+    page it got, which may have been short because the probe query ran out
+    of names; the server clamps the request to its real maximum.
+    """
+    if capabilities.get("bulk_path"):
+        return {"strategy": "bulk", "path": capabilities["bulk_path"]}
+    size_param = capabilities.get("size_param")
+    params = {size_param: capabilities["requested_size"]} if size_param else {}
+    if capabilities.get("offset_param"):
+        return {"strategy": "paged", "params": params, "page_size": capabilities["page_size"],
+                "offset_param": capabilities["offset_param"]}
+    if capabilities.get("page_param"):
+        return {"strategy": "paged", "params": params, "page_size": capabilities["page_size"],
+                "page_param": capabilities["page_param"], "first_page": capabilities["first_page"]}
+    return {"strategy": "prefix", "params": params}
+
+
+def save_capabilities(capabilities, path=DEFAULT_CAPABILITIES_PATH):
+    with open(path, "w") as f:
+        json.dump(capabilities, f, indent=2)
+
+
+def load_capabilities(path=DEFAULT_CAPABILITIES_PATH):
+    """Version -> capabilities, as saved by CapabilityProbe.run"""
+    with open(path) as f:
+        return json.load(f)
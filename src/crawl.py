@@ -0,0 +1,366 @@
+import bisect
+import string
+
+
+def is_saturated(results, result_cap):
+    """A response is saturated when it hit the server's result cap, so more names may exist"""
+    return bool(result_cap) and len(results) >= result_cap
+
+
+def is_sorted(results):
+    """Whether names came back in (case-insensitive) lexicographic order"""
+    keys = [name.lower() for name in results]
+    return keys == sorted(keys)
+
+
+def child_boundary(prefix, results):
+    """
+    First child character of a saturated prefix that still needs querying,
+    or None if every child does.
+
+    When the response is sorted, every child that sorts before the last name
+    returned was fully covered by the response, so the crawl can skip ahead to
+    the child containing the last name and the children after it.
+    """
+    if not results or not is_sorted(results):
+        return None
+    last = results[-1].lower()
+    if not last.startswith(prefix) or len(last) == len(prefix):
+        return None
+    return last[len(prefix)]
+
+
+def child_prefixes(prefix, results, alphabet=string.ascii_lowercase):
+    """Child prefixes of a saturated prefix that still need querying (see child_boundary)"""
+    boundary = child_boundary(prefix, results)
+    return [prefix + char for char in alphabet if boundary is None or char >= boundary]
+
+
+class AlphabetModel:
+    """
+    Branching alphabet learned from the names a crawl has seen.
+
+    Every character found in a name joins the alphabet, so digits, spaces,
+    hyphens or dots are crawled once they show up. Per-position and
+    previous-character counts then prune children: a character is dropped
+    after a prefix when enough names reach that position (or follow that
+    character) that we would expect to have seen it there at least
+    min_expected times, given its overall frequency, but never have.
+
+    Sorted, truncated responses only show the lowest names under a prefix, so
+    positional counts are taken from complete (unsaturated) responses only,
+    and only for positions after the query prefix.
+    """
+    def __init__(self, seed_alphabet=string.ascii_lowercase, min_expected=5.0):
+        self.alphabet = set(seed_alphabet)
+        self.min_expected = min_expected
+        self.char_counts = {}
+        self.total_chars = 0
+        self.position_counts = []  # position -> {char: count}
+        self.names_reaching = []  # position -> number of counted names that reach it
+        self.follow_counts = {}  # previous char -> {char: count}
+        self.follow_totals = {}  # previous char -> number of counted chars after it
+
+    def observe(self, names, prefix="", complete=False):
+        """
+        Learn from one response for prefix; complete means it was not saturated.
+        Returns characters not seen before, sorted.
+        """
+        learned = set()
+        for name in names:
+            name = name.lower()
+            for char in name:
+                if char not in self.alphabet:
+                    self.alphabet.add(char)
+                    learned.add(char)
+            if not complete:
+                continue
+            for position in range(len(prefix), len(name)):
+                char = name[position]
+                while position >= len(self.position_counts):
+                    self.position_counts.append({})
+                    self.names_reaching.append(0)
+                counts = self.position_counts[position]
+                counts[char] = counts.get(char, 0) + 1
+                self.names_reaching[position] += 1
+                self.char_counts[char] = self.char_counts.get(char, 0) + 1
+                self.total_chars += 1
+                if position:
+                    previous = name[position - 1]
+                    follows = self.follow_counts.setdefault(previous, {})
+                    follows[char] = follows.get(char, 0) + 1
+                    self.follow_totals[previous] = self.follow_totals.get(previous, 0) + 1
+        return sorted(learned)
+
+    def _unsurprising(self, char, count, total):
+        """False when char was never seen in `total` chances where we'd expect min_expected sightings"""
+        if count:
+            return True
+        frequency = self.char_counts.get(char, 0) / max(1, self.total_chars)
+        return total * frequency < self.min_expected
+
+    def plausible(self, char, position, previous=None):
+        """Whether char could plausibly appear at position (after previous), given the names seen so far"""
+        if self.min_expected is None:
+            return True
+        if position < len(self.position_counts) and not self._unsurprising(
+                char, self.position_counts[position].get(char, 0), self.names_reaching[position]):
+            return False
+        if previous is not None and not self._unsurprising(
+                char, self.follow_counts.get(previous, {}).get(char, 0), self.follow_totals.get(previous, 0)):
+            return False
+        return True
+
+    def candidates(self, prefix):
+        """Characters worth branching on after prefix, in sorted order"""
+        position = len(prefix)
+        previous = prefix[-1].lower() if prefix else None
+        return [char for char in sorted(self.alphabet) if self.plausible(char, position, previous)]
+
+
+class ExpandedPrefixes:
+    """
+    The roots and expanded prefixes of a crawl, so that a character learned
+    mid-crawl is branched on under the prefixes expanded before it was known,
+    not only queried as a new root. roots=None leaves roots to someone else,
+    as when a crawl covers only the subtrees under its seeds.
+    """
+    def __init__(self, roots=None):
+        self.roots = None if roots is None else set(roots)
+        self.boundaries = {}  # expanded prefix -> its child_boundary
+
+    def add(self, prefix, results=None):
+        """Record that prefix's children were queued, given the response it was expanded from"""
+        self.boundaries[prefix] = child_boundary(prefix, results)
+
+    def learned(self, chars):
+        """
+        Prefixes to query for characters seen for the first time: each as a
+        new root, and as a child of every expanded prefix whose response
+        didn't already cover it
+        """
+        if self.roots is not None:
+            chars = [char for char in chars if char not in self.roots]
+            self.roots.update(chars)
+        prefixes = list(chars) if self.roots is not None else []
+        for prefix, boundary in self.boundaries.items():
+            prefixes.extend(prefix + char for char in chars if boundary is None or char >= boundary)
+        return prefixes
+
+
+class DeferredPrefixes:
+    """
+    Prefixes a crawl passed over because the alphabet model found their last
+    character implausible at the time.
+
+    The model keeps learning after a branch is pruned, so once the crawl's
+    queue drains, recheck() hands back the deferred prefixes that are
+    plausible now. Those are fetched without being pruned again, and the rest
+    stay deferred for the next recheck.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.pending = []
+        self.rechecked = set()
+
+    def _plausible(self, prefix):
+        return len(prefix) < 2 or self.model.plausible(prefix[-1].lower(), len(prefix) - 1, prefix[-2].lower())
+
+    def __len__(self):
+        return len(self.pending)
+
+    def prune(self, prefix):
+        """Whether to pass over prefix for now; a pruned prefix is kept for recheck()"""
+        if prefix in self.rechecked or self._plausible(prefix):
+            return False
+        self.pending.append(prefix)
+        return True
+
+    def recheck(self):
+        """Deferred prefixes that are plausible now"""
+        ready = [prefix for prefix in self.pending if self._plausible(prefix)]
+        self.rechecked.update(ready)
+        self.pending = [prefix for prefix in self.pending if prefix not in self.rechecked]
+        return ready
+
+
+class ReferenceIndex:
+    """
+    Names already recovered from one version, in the server's case-insensitive
+    order, used to predict another version's responses prefix by prefix
+    """
+    def __init__(self, names):
+        self.names = sorted(names, key=str.lower)
+        self.keys = [name.lower() for name in self.names]
+
+    def under(self, prefix):
+        """Reference names starting with prefix, in server order"""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + chr(0x10FFFF), start)
+        return self.names[start:end]
+
+    def matches(self, prefix, results):
+        """Whether a response holds exactly the names the reference predicts for prefix"""
+        expected = self.under(prefix)
+        if len(results) > len(expected):
+            return False
+        return set(results) == set(expected[:len(results)])
+
+    def spot_checks(self, prefix, verified, result_cap, count=2):
+        """
+        Prefixes that test the part of prefix's subtree a saturated response
+        didn't show: for up to count reference names past the first `verified`,
+        ending with the last one, the shortest prefix of the name under which
+        the reference has fewer than result_cap names, so one unsaturated
+        response settles it.
+        """
+        expected = self.under(prefix)
+        tail = expected[verified:]
+        if not tail or not count:
+            return []
+        picks = [tail[len(tail) * (i + 1) // count - 1] for i in range(count)]
+        checks = []
+        for name in picks:
+            name = name.lower()
+            if len(name) <= len(prefix):
+                continue
+            for length in range(len(prefix) + 1, len(name) + 1):
+                if len(self.under(name[:length])) < result_cap:
+                    break
+            check = name[:length]
+            if check not in checks:
+                checks.append(check)
+        return checks
+
+
+class SpotCheckVerifier:
+    """
+    Decides, for a crawl guided by an earlier one (another version or a
+    previous run), whether a saturated prefix's subtree can be taken from the
+    earlier crawl instead of being expanded.
+
+    A saturated response that agrees with the earlier crawl is held while
+    spot checks of the rest of its subtree are fetched. If every check
+    agrees and is unsaturated, the subtree is accepted; the first that
+    doesn't expands the prefix with the held response. The callers supply
+    agrees(prefix, results), spot_checks(prefix, results) -> prefixes,
+    accept(prefix) and expand(prefix, results, check) -> children, where
+    check is the spot check that failed, or None.
+    """
+    def __init__(self, agrees, spot_checks, accept, expand):
+        self.agrees = agrees
+        self.spot_checks = spot_checks
+        self.accept = accept
+        self.expand = expand
+        self.heads = {}  # saturated prefix -> its response, while spot checks are outstanding
+        self.pending = {}  # saturated prefix -> number of spot checks outstanding
+        self.checks = {}  # spot check prefix -> the prefix it checks
+
+    def handle(self, prefix, results, saturated):
+        """Children to queue for a response"""
+        head = self.checks.pop(prefix, None)
+        if head is not None:
+            if head not in self.pending:
+                return []  # Already settled by another check
+            if self.agrees(prefix, results) and not saturated:
+                self.pending[head] -= 1
+                if not self.pending[head]:
+                    del self.pending[head]
+                    self.heads.pop(head)
+                    self.accept(head)
+                return []
+            del self.pending[head]
+            return self.expand(head, self.heads.pop(head), prefix)
+        if not saturated:
+            return []
+        if not self.agrees(prefix, results):
+            return self.expand(prefix, results, None)
+        probes = self.spot_checks(prefix, results)
+        if not probes:
+            self.accept(prefix)
+            return []
+        self.heads[prefix] = results
+        self.pending[prefix] = len(probes)
+        for probe in probes:
+            self.checks[probe] = prefix
+        return list(probes)
+
+
+class YieldFrontier:
+    """
+    Scores prefixes by expected new names per request, for crawls that have
+    to make the most of a fixed request budget.
+
+    A saturated prefix's size is estimated from how far a sorted response got
+    through its children: len(results) names filled the children up to the one
+    holding the last name, so the prefix holds about len(results) divided by
+    those children's share of it. Children get shares of the size by how often
+    their last character follows the one before it in the names seen so far;
+    the child the response was cut off in holds at least twice what it showed.
+    A child's score is its names not yet seen divided by the requests its
+    subtree should take to crawl (about one per half a result cap of names),
+    scaled by how much of the parent's response was new.
+    """
+    def __init__(self, model, max_depth=8):
+        self.model = model
+        self.max_depth = max_depth
+        self.known = {}  # prefix -> names seen under it, for prefixes up to max_depth long
+        self.follows = {}  # previous char -> {char: count}, over every name seen
+        self.follow_totals = {}
+        self.char_counts = {}
+        self.total_chars = 0
+        self.scores = {}  # prefix -> expected new names per request
+
+    def observe(self, names):
+        """Count names seen (from any response) under each of their prefixes"""
+        for name in names:
+            name = name.lower()
+            for length in range(1, min(len(name), self.max_depth) + 1):
+                key = name[:length]
+                self.known[key] = self.known.get(key, 0) + 1
+            for char in name:
+                self.char_counts[char] = self.char_counts.get(char, 0) + 1
+            self.total_chars += len(name)
+            for previous, char in zip(name, name[1:]):
+                follows = self.follows.setdefault(previous, {})
+                follows[char] = follows.get(char, 0) + 1
+                self.follow_totals[previous] = self.follow_totals.get(previous, 0) + 1
+
+    def score(self, prefix):
+        """Expected new names per request; prefixes never scored (seeds) come first"""
+        return self.scores.get(prefix, float("inf"))
+
+    def _weight(self, prefix, char):
+        """Smoothed share of the names under prefix that continue with char"""
+        previous = prefix[-1].lower() if prefix else None
+        counted = self.model.follow_counts.get(previous, {}).get(char, 0)
+        # Any sighting shows the pair exists; never seeing it only counts once it would have been expected
+        expected = self.follow_totals.get(previous, 0) * self.char_counts.get(char, 0) / max(1, self.total_chars)
+        seen = 1 if self.follows.get(previous, {}).get(char) or expected < 3 else 1 / len(self.model.alphabet)
+        return counted + seen
+
+    def expand(self, parent, results, new_names, children, result_cap):
+        """Estimate and score the children queued for a saturated parent"""
+        if not children:
+            return
+        weights = {char: self._weight(parent, char) for char in self.model.alphabet}
+        total_weight = sum(weights.values())
+        size = self.known.get(parent, 0)
+        if results and is_sorted(results) and results[-1].lower().startswith(parent.lower()):
+            last = results[-1].lower()
+            if len(last) > len(parent):
+                # Children before the one holding the last name are full; count that one as half full
+                boundary = last[len(parent)]
+                covered = sum(w for char, w in weights.items() if char < boundary) + weights.get(boundary, 0) / 2
+                size = max(size, len(results) * total_weight / max(covered, 1e-9))
+        size = max(size, result_cap * 2)
+
+        freshness = len(new_names) / len(results) if results else 1.0
+        for child in children:
+            seen = self.known.get(child.lower(), 0)
+            child_size = size * weights.get(child[-1].lower(), 0) / total_weight
+            if seen:
+                child_size = max(child_size, 2 * seen)
+            requests = max(1.0, 2 * child_size / result_cap)
+            self.scores[child] = (child_size - seen) / requests * (0.5 + 0.5 * freshness)
@@ -1,26 +1,98 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import os
 import requests
+import sys
 import time
-import string
 import json
 from collections import deque, Counter
-import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from async_engine import AsyncCrawlEngine
+from capabilities import DEFAULT_CAPABILITIES_PATH, CapabilityProbe, load_capabilities, save_capabilities
+from checkpoint import CrawlCheckpoint
+from name_store import NameStore, write_json_list
+from name_stream import NameStream
+from fingerprints import PrefixFingerprints
+from crawl import AlphabetModel, DeferredPrefixes, ExpandedPrefixes, ReferenceIndex, SpotCheckVerifier, YieldFrontier, is_saturated, child_prefixes
+from metrics import CrawlMetrics, MetricsReporter
+from rate_limiter import RateLimiter
+from rate_probe import DEFAULT_PROFILE_PATH, load_profile
+from response_cache import DEFAULT_TIMEOUT, ResponseCache, make_key
+from singleflight import SingleFlight
+
+# Strategies iter_names can stream, by name -> extractor method
+STRATEGIES = {
+    "planned": "planned_approach",
+    "saturation": "saturation_approach",
+    "prioritized": "prioritized_approach",
+    "bfs": "bfs_approach",
+    "parallel": "parallel_extraction",
+    "optimized": "optimized_approach",
+}
 
 class AutocompleteAPIExtractor:
-    def __init__(self, base_url="http://35.200.185.69:8000"):
+    def __init__(self, base_url="http://35.200.185.69:8000", rate_limiter=None, cache=None, stream_dir=None,
+                 metrics=None, rate_profile=None, capabilities=None):
         self.base_url = base_url
         self.versions = ["v1", "v2", "v3"]
         self.valid_versions = []
         self.request_count = {v: 0 for v in self.versions}
-        self.results = {v: set() for v in self.versions}
-        self.rate_limit_wait = 0.1  # Initial wait time between requests
+        self.results = {v: NameStore() for v in self.versions}
+        self.stream_dir = stream_dir  # Where run_extraction streams {version}_names.ndjson, if set
+        self.result_caps = {v: None for v in self.versions}  # Largest response size seen per version
+        self.alphabet_models = {v: AlphabetModel() for v in self.versions}  # Branching alphabet learned per version
+        self.fingerprints = {v: PrefixFingerprints() for v in self.versions}  # Hash of every response, for incremental runs
+        self.deltas = {}  # Names added and removed per version by an incremental run
+        self.rate_limit_wait = 0.1  # Initial wait time between requests, for versions without a profile
+        if isinstance(rate_profile, (str, os.PathLike)):
+            rate_profile = load_profile(rate_profile)
+        self.rate_profile = rate_profile or {}  # Measured limits per version (see rate_probe.py)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter.from_profile(self.rate_profile, initial_rate=1 / self.rate_limit_wait)
+        self.rate_limiter = rate_limiter
         self.max_retries = 3
+        self.connect_timeout, self.read_timeout = DEFAULT_TIMEOUT  # Seconds to connect, and to wait for response data
+        self.deadline = None  # time.monotonic() after which no more requests are sent (see run_extraction)
+        self.cancelled = set()  # Versions whose crawl should send no more requests (see NameStream.close)
+        self.hedge_requests = False  # Duplicate async requests that run past hedge_percentile latency
+        self.hedge_percentile = 95
+        self.hedge_min_samples = 20  # Requests measured before hedging starts
+        self.max_concurrency = 5  # Open connections used by the async engine
+        # Per-version override of max_concurrency, enough to keep each profiled rate in flight
+        self.version_concurrency = {
+            version: profile["concurrency"] for version, profile in self.rate_profile.items() if profile.get("concurrency")
+        }
+        self.max_connections = 15  # Cap on open connections across versions crawled at once
+        if isinstance(capabilities, (str, os.PathLike)):
+            capabilities = load_capabilities(capabilities)
+        self.capabilities = capabilities or {}  # Page parameters and bulk endpoints per version (see capabilities.py)
+        self.probe_capabilities = True  # Probe versions missing from capabilities before extracting them
+        self.elapsed = {}  # Wall time per version
+        self.session = requests.Session()  # Reuse keep-alive connections
+        if cache is None:
+            cache = ResponseCache()
+        self.cache = cache or None  # Pass cache=False to always hit the network
+        self.metrics = metrics or CrawlMetrics()
+        self.single_flight = SingleFlight()  # Shares in-flight identical requests
         
     def test_versions(self):
         """Check which API versions are available"""
         for version in self.versions:
+            if version in self.valid_versions:
+                continue
+            if self.cache is not None and self.cache.get(self.base_url, version, "a") is not None:
+                # A cached successful probe means the version is up; don't spend budget re-probing
+                self.valid_versions.append(version)
+                print(f"✓ Version {version} is supported (cached)")
+                continue
             try:
-                response = requests.get(f"{self.base_url}/{version}/autocomplete?query=a")
+                self.rate_limiter.acquire(version)
+                response = self.session.get(f"{self.base_url}/{version}/autocomplete?query=a", timeout=self.timeout())
                 if response.status_code == 200:
+                    if self.cache is not None:
+                        self.cache.put(self.base_url, version, "a", response.json())
                     self.valid_versions.append(version)
                     print(f"✓ Version {version} is supported")
                 else:
@@ -30,52 +102,169 @@ class AutocompleteAPIExtractor:
                 
         return self.valid_versions
         
-    def make_request(self, version, query):
-        """Make a single request to the API with retry logic and rate limiting"""
-        url = f"{self.base_url}/{version}/autocomplete?query={query}"
+    def remaining(self):
+        """Seconds left before the crawl deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def expired(self, version=None):
+        """Whether the crawl deadline has passed, or version's crawl was cancelled"""
+        if version is not None and version in self.cancelled:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def timeout(self):
+        """(connect, read) timeout for one request, cut short by the crawl deadline"""
+        remaining = self.remaining()
+        if remaining is None:
+            return self.connect_timeout, self.read_timeout
+        remaining = max(remaining, 0.001)  # A zero timeout would mean none at all
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+    
+    def hedge_delay(self, version):
+        """Seconds after which the async engine sends a duplicate of a request, or None not to hedge"""
+        if not self.hedge_requests:
+            return None
+        return self.metrics.latency_percentile(version, self.hedge_percentile, self.hedge_min_samples)
+    
+    def make_request(self, version, query, params=None):
+        """
+        Make a single request to the API with retry logic, rate limiting and caching.
+        Identical concurrent requests share one network call. Past the crawl
+        deadline, uncached requests return None without being sent, so the
+        prefix isn't mistaken for one without names.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.base_url, version, query, params)
+            if cached is not None:
+                return cached
+        
+        key = (version, make_key(self.base_url, version, query, params))
+        return self.single_flight.do(key, lambda: self._request(version, query, params))
+    
+    def _request(self, version, query, params=None):
+        """The network part of make_request"""
+        url = f"{self.base_url}/{version}/autocomplete"
         
         for attempt in range(self.max_retries):
+            if self.expired(version):
+                return None
+            if attempt:
+                self.metrics.record_retry(version)
             try:
-                response = requests.get(url)
+                self.rate_limiter.acquire(version)
+                start = time.perf_counter()
+                response = self.session.get(url, params={"query": query, **(params or {})}, timeout=self.timeout())
+                self.metrics.record_request(version, time.perf_counter() - start, response.status_code, len(response.content))
                 self.request_count[version] += 1
                 
                 if response.status_code == 200:
-                    return response.json()
+                    self.rate_limiter.on_success(version)
+                    data = response.json()
+                    if self.cache is not None:
+                        self.cache.put(self.base_url, version, query, data, params)
+                    return data
                 elif response.status_code == 429:  # Too Many Requests
-                    wait_time = self.rate_limit_wait * (2 ** attempt)
-                    print(f"Rate limited. Waiting {wait_time:.2f}s before retry.")
-                    time.sleep(wait_time)
-                    self.rate_limit_wait *= 1.5  # Increase wait time for future requests
+                    # The limiter backs off and honours Retry-After before the next attempt
+                    print(f"Rate limited on '{query}'. Backing off before retry.")
+                    self.rate_limiter.on_throttle(version, response.headers.get("Retry-After"))
                 else:
                     print(f"Error: Status code {response.status_code} for query '{query}'")
                     return []
                     
+            except requests.exceptions.Timeout as e:
+                self.metrics.record_timeout(version)
+                print(f"Request timed out for '{query}': {e}")
             except requests.exceptions.RequestException as e:
+                self.metrics.record_error(version)
                 print(f"Request error for '{query}': {e}")
-                time.sleep(self.rate_limit_wait)
                 
         print(f"Max retries exceeded for query '{query}'")
         return []
     
-    def bfs_approach(self, version, max_depth=5):
+    def fetch_bulk(self, version, path):
+        """Names served at path (e.g. "/v3/names"), or None if it doesn't return a list of names"""
+        try:
+            self.rate_limiter.acquire(version)
+            response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout())
+            self.request_count[version] += 1
+            if response.status_code != 200:
+                return None
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+        if isinstance(data, list) and all(isinstance(name, str) for name in data):
+            return data
+        return None
+    
+    def retrieval_plan(self, version):
+        """Cheapest way to retrieve version's names, probing its capabilities first if unknown"""
+        if not self.probe_capabilities and version not in self.capabilities:
+            return {"strategy": "prefix", "params": {}}
+        if version not in self.capabilities:
+            self.capabilities[version] = CapabilityProbe(self).probe(version)
+        return self.capabilities[version]["plan"]
+    
+    def concurrency_for(self, version):
+        """Open connections the async engine may use for version"""
+        return self.version_concurrency.get(version, self.max_concurrency)
+    
+    def _resume(self, version, checkpoint, seeds):
+        """Restore names and counters from a checkpoint and return its state"""
+        state = checkpoint.load(seeds)
+        if state["completed"]:
+            self.results[version].add_many(state["names"], stream=False)
+            self.alphabet_models[version].observe(state["names"])  # Alphabet only; positions come from new responses
+            self.request_count[version] = max(self.request_count[version], state["request_count"])
+            print(f"Resuming {version} from {checkpoint.path}: {len(state['completed'])} prefixes done, "
+                  f"{len(state['frontier'])} queued, {len(self.results[version])} names")
+        return state
+    
+    def _learn(self, version, prefix, results):
         """
-        Use Breadth-First Search to explore all possible name combinations
+        Update the detected result cap, the alphabet model and the response
+        fingerprints from one response. Returns characters seen for the first time.
+        """
+        self.fingerprints[version].record(prefix, results)
+        self.result_caps[version] = max(self.result_caps[version] or 0, len(results))
+        complete = not is_saturated(results, self.result_caps[version])
+        return self.alphabet_models[version].observe(results, prefix, complete)
+    
+    def bfs_approach(self, version, max_depth=5, checkpoint=None):
+        """
+        Use Breadth-First Search to explore all possible name combinations.
+        Branches on the alphabet learned from names seen so far.
+        Progress is journaled to checkpoint (a CrawlCheckpoint) when given.
         """
         print(f"\nExtracting names using BFS approach for {version}...")
-        queue = deque(string.ascii_lowercase)
-        seen = set(string.ascii_lowercase)
-        
-        depth = 1
+        model = self.alphabet_models[version]
+        roots = sorted(model.alphabet)
+        queue = deque(roots)
+        seen = set(roots)
         names_found = 0
         
+        if checkpoint is not None:
+            state = self._resume(version, checkpoint, roots)
+            if state["done"]:
+                print(f"BFS approach already completed for {version}")
+                return self.results[version]
+            queue = deque(state["frontier"])
+            seen = state["seen"]
+            names_found = len(self.results[version])
+        branches = ExpandedPrefixes(seen)
+        
+        depth = len(queue[0]) if queue else 1
+        
         while queue and depth <= max_depth:
             # Report progress
             print(f"Depth {depth}: Queue size {len(queue)}, Names found so far: {names_found}")
             
-            # Process all prefixes at the current depth
-            level_size = len(queue)
-            for _ in range(level_size):
+            # Process all prefixes at the current depth (and roots for newly learned characters)
+            while queue and len(queue[0]) <= depth:
                 prefix = queue.popleft()
+                self.metrics.record_queue_depth(version, len(queue))
+                children = []
                 
                 # Get autocomplete results for this prefix
                 results = self.make_request(version, prefix)
@@ -83,9 +272,15 @@ class AutocompleteAPIExtractor:
                 # Handle different response formats
                 if isinstance(results, list):
                     # Add new names to the results set
-                    new_names = set(results) - self.results[version]
-                    self.results[version].update(new_names)
+                    new_names = self.results[version].add_many(results)
                     names_found += len(new_names)
+                    self.metrics.record_yield(version, len(prefix), len(results), len(new_names))
+                    learned = self._learn(version, prefix, results)
+                    for new_prefix in branches.learned(learned):
+                        if new_prefix not in seen:
+                            queue.append(new_prefix)
+                            seen.add(new_prefix)
+                            children.append(new_prefix)
                     
                     # Check if we need to go deeper with this prefix
                     if len(results) > 0:
@@ -95,17 +290,21 @@ class AutocompleteAPIExtractor:
                             pass
                         else:
                             # Add character extensions to the queue
-                            for char in string.ascii_lowercase:
+                            for char in model.candidates(prefix):
                                 new_prefix = prefix + char
                                 if new_prefix not in seen:
                                     queue.append(new_prefix)
                                     seen.add(new_prefix)
-                
-                # Add a small delay to avoid rate limiting
-                time.sleep(self.rate_limit_wait)
+                                    children.append(new_prefix)
+                            branches.add(prefix)
+                    
+                    if checkpoint is not None:
+                        checkpoint.record(prefix, new_names, children, self.request_count[version], len(results))
             
             depth += 1
         
+        if checkpoint is not None and not self.expired(version):
+            checkpoint.mark_done()
         print(f"BFS approach completed for {version}. Total names found: {len(self.results[version])}")
         return self.results[version]
     
@@ -114,170 +313,634 @@ class AutocompleteAPIExtractor:
         An optimized approach that adapts based on API behavior
         """
         print(f"\nExtracting names using optimized approach for {version}...")
-        all_names = set()
-        prefixes_to_try = list(string.ascii_lowercase)
+        all_names = self.results[version]
+        model = self.alphabet_models[version]
+        prefixes_to_try = sorted(model.alphabet)
+        result_counts = {}
         
-        # First, try single character prefixes
+        # First, try single character prefixes, including characters learned along the way
         for prefix in prefixes_to_try:
             results = self.make_request(version, prefix)
             
             if isinstance(results, list):
-                all_names.update(results)
+                result_counts[prefix] = len(results)
+                new_names = all_names.add_many(results)
+                self.metrics.record_yield(version, 1, len(results), len(new_names))
+                prefixes_to_try.extend(self._learn(version, prefix, results))
                 print(f"Prefix '{prefix}' returned {len(results)} names. Total unique names: {len(all_names)}")
-            
-            time.sleep(self.rate_limit_wait)
         
         # Check if we got a reasonable number of results
         # If we received too many results with single characters, we may need to go deeper
-        if all(len(self.make_request(version, c)) >= 100 for c in 'aeiou'):
+        if all(result_counts.get(c, 0) >= 100 for c in 'aeiou'):
             print("Single character queries return too many results. Trying two-character prefixes...")
             
             # Try two-character prefixes
-            for first in string.ascii_lowercase:
-                for second in string.ascii_lowercase:
+            for first in prefixes_to_try:
+                for second in model.candidates(first):
                     prefix = first + second
                     results = self.make_request(version, prefix)
                     
                     if isinstance(results, list):
-                        new_names = set(results) - all_names
-                        all_names.update(new_names)
+                        new_names = all_names.add_many(results)
+                        self._learn(version, prefix, results)
+                        self.metrics.record_yield(version, 2, len(results), len(new_names))
                         print(f"Prefix '{prefix}' returned {len(results)} names ({len(new_names)} new). Total: {len(all_names)}")
-                    
-                    time.sleep(self.rate_limit_wait)
         
-        self.results[version] = all_names
         print(f"Optimized approach completed for {version}. Total names found: {len(all_names)}")
         return all_names
     
     def parallel_extraction(self, version, prefix_length=2):
         """
-        Extract names using parallel requests for better efficiency
+        Extract names using parallel requests for better efficiency.
+        Requests go through the asyncio engine over pooled keep-alive connections.
+        Prefixes using characters learned during the crawl are queued as they are found.
         """
         print(f"\nExtracting names using parallel approach for {version} with prefix length {prefix_length}...")
-        all_names = set()
+        all_names = self.results[version]
+        model = self.alphabet_models[version]
         
         # Generate all possible prefixes of the given length
-        prefixes = []
-        def generate_prefixes(current, depth):
-            if depth == 0:
-                prefixes.append(current)
-                return
-            for char in string.ascii_lowercase:
-                generate_prefixes(current + char, depth - 1)
-        
-        generate_prefixes("", prefix_length)
+        prefixes = ["".join(chars) for chars in itertools.product(sorted(model.alphabet), repeat=prefix_length)]
         print(f"Generated {len(prefixes)} prefixes to query")
         
-        # Function to process a single prefix
-        def process_prefix(prefix):
-            local_results = self.make_request(version, prefix)
-            time.sleep(self.rate_limit_wait)  # Still respect rate limiting
-            return set(local_results) if isinstance(local_results, list) else set()
-        
-        # Process prefixes in parallel
-        batch_size = 10  # Process this many prefixes at a time
-        for i in range(0, len(prefixes), batch_size):
-            batch = prefixes[i:i+batch_size]
+        # Workers pull prefixes from one shared queue, so there are no per-batch barriers
+        processed = 0
+        def handle_result(prefix, results):
+            nonlocal processed
+            result_set = results if isinstance(results, list) else []
+            new_names = all_names.add_many(result_set)
+            self.metrics.record_yield(version, len(prefix), len(result_set), len(new_names))
+            learned = self._learn(version, prefix, result_set)
+            processed += 1
+            print(f"Prefix '{prefix}' returned {len(result_set)} names ({len(new_names)} new). Total: {len(all_names)}")
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                future_to_prefix = {executor.submit(process_prefix, prefix): prefix for prefix in batch}
-                
-                for future in concurrent.futures.as_completed(future_to_prefix):
-                    prefix = future_to_prefix[future]
-                    try:
-                        result_set = future.result()
-                        new_names = result_set - all_names
-                        all_names.update(new_names)
-                        print(f"Prefix '{prefix}' returned {len(result_set)} names ({len(new_names)} new). Total: {len(all_names)}")
-                    except Exception as e:
-                        print(f"Error processing prefix '{prefix}': {e}")
+            if processed % 10 == 0 or processed == len(prefixes):
+                print(f"Processed {processed}/{len(prefixes)} prefixes. Current total: {len(all_names)} names")
             
-            print(f"Processed {i+len(batch)}/{len(prefixes)} prefixes. Current total: {len(all_names)} names")
+            # Queue the prefixes that contain a newly learned character and are plausible at each position
+            new_prefixes = [
+                "".join(chars) for chars in itertools.product(sorted(model.alphabet), repeat=prefix_length)
+                if any(char in learned for char in chars)
+                and all(model.plausible(char, position, chars[position - 1] if position else None)
+                        for position, char in enumerate(chars))
+            ] if learned else []
+            prefixes.extend(new_prefixes)
+            return new_prefixes
+        
+        engine = AsyncCrawlEngine(self, concurrency=self.concurrency_for(version))
+        engine.run(version, prefixes, handle_result)
         
-        self.results[version] = all_names
         print(f"Parallel approach completed for {version}. Total names found: {len(all_names)}")
         return all_names
     
-    def discover_v3_endpoint(self):
-        """Try to discover any special endpoints or features in v3"""
-        if "v3" not in self.valid_versions:
-            print("v3 is not a valid version")
+    def saturation_approach(self, version, result_cap=None, checkpoint=None, seeds=None, params=None, exclude=None):
+        """Expand only prefixes whose response hit the result cap, optionally under seeds and skipping exclude"""
+        print(f"\nExtracting names using saturation-aware approach for {version}...")
+        if result_cap:
+            self.result_caps[version] = result_cap
+        
+        model = self.alphabet_models[version]
+        add_roots = not seeds
+        seeds = list(seeds or sorted(model.alphabet))
+        roots = set(seeds)
+        if checkpoint is not None:
+            state = self._resume(version, checkpoint, seeds)
+            if state["done"]:
+                print(f"Saturation-aware approach already completed for {version}")
+                return self.results[version]
+            seeds = state["frontier"]
+            roots = state["seen"]
+            if not result_cap and state["max_result_size"]:
+                self.result_caps[version] = max(self.result_caps[version] or 0, state["max_result_size"])
+        
+        expanded = 0
+        deferred = DeferredPrefixes(model)
+        branches = ExpandedPrefixes(roots if add_roots else None)
+        def handle_result(prefix, results):
+            nonlocal expanded
+            if not isinstance(results, list):
+                return []
+            
+            new_names = self.results[version].add_many(results)
+            self.metrics.record_yield(version, len(prefix), len(results), len(new_names))
+            learned = self._learn(version, prefix, results)
+            
+            children = branches.learned(learned)
+            if is_saturated(results, self.result_caps[version]):
+                children.extend(child_prefixes(prefix, results, sorted(model.alphabet)))
+                branches.add(prefix, results)
+                expanded += 1
+                print(f"Prefix '{prefix}' saturated at {len(results)} names, expanding {len(children)} children. Total: {len(self.results[version])}")
+            
+            if checkpoint is not None:
+                checkpoint.record(prefix, new_names, children, self.request_count[version], len(results))
+            return children
+        
+        def implausible(prefix):
+            if exclude and prefix in exclude:
+                return True
+            # Judge the branch when it is dequeued, with everything learned since it was queued
+            return deferred.prune(prefix)
+        
+        def revisit():
+            ready = deferred.recheck()
+            if ready:
+                print(f"Revisiting {len(ready)} pruned prefixes that are plausible now")
+            return ready
+        
+        engine = AsyncCrawlEngine(self, concurrency=self.concurrency_for(version), params=params)
+        engine.run(version, seeds, handle_result, skip=implausible, on_drain=revisit)
+        
+        if checkpoint is not None and not self.expired(version):
+            checkpoint.mark_done()
+        print(f"Saturation-aware approach completed for {version}. Result cap: {self.result_caps[version]}, "
+              f"prefixes expanded: {expanded}, pruned as implausible: {len(deferred)}, "
+              f"total names found: {len(self.results[version])}")
+        return self.results[version]
+    
+    def prioritized_approach(self, version, max_requests=None, max_seconds=None, prioritize=True):
+        """Saturation-aware crawl that fetches the highest-yield prefixes first, within a request or time budget"""
+        print(f"\nExtracting names using prioritized approach for {version}"
+              f"{f', budget {max_requests} requests' if max_requests else ''}"
+              f"{f', budget {max_seconds:.0f}s' if max_seconds else ''}...")
+        store = self.results[version]
+        model = self.alphabet_models[version]
+        frontier = YieldFrontier(model)
+        frontier.observe(store)
+        seeds = sorted(model.alphabet)
+        branches = ExpandedPrefixes(seeds)
+        deferred = DeferredPrefixes(model)
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        start_count = self.request_count[version]
+        unvisited = 0
+        
+        def handle_result(prefix, results):
+            if not isinstance(results, list):
+                return []
+            
+            new_names = store.add_many(results)
+            frontier.observe(new_names)
+            self.metrics.record_yield(version, len(prefix), len(results), len(new_names))
+            learned = self._learn(version, prefix, results)
+            
+            children = branches.learned(learned)
+            if is_saturated(results, self.result_caps[version]):
+                expansion = child_prefixes(prefix, results, sorted(model.alphabet))
+                frontier.expand(prefix, results, new_names, expansion, self.result_caps[version])
+                branches.add(prefix, results)
+                children.extend(expansion)
+            spent = self.request_count[version] - start_count
+            if spent % 50 == 0:
+                print(f"{spent} requests, {len(store)} names, last prefix '{prefix}' ({len(new_names)} new)")
+            return children
+        
+        def skip(prefix):
+            nonlocal unvisited
+            spent = self.request_count[version] - start_count
+            if (max_requests is not None and spent >= max_requests) or (deadline and time.monotonic() >= deadline):
+                unvisited += 1
+                return True
+            return deferred.prune(prefix)
+        
+        engine = AsyncCrawlEngine(self, concurrency=self.concurrency_for(version))
+        engine.run(version, seeds, handle_result, skip=skip, priority=frontier.score if prioritize else None,
+                   on_drain=deferred.recheck)
+        
+        status = f"budget exhausted with {unvisited} prefixes unvisited" if unvisited else "frontier exhausted"
+        print(f"Prioritized approach completed for {version} after {self.request_count[version] - start_count} "
+              f"requests ({status}). "
+              f"Total names found: {len(store)}")
+        return store
+    
+    def differential_approach(self, version, reference, verify_depth=1, spot_checks=2):
+        """Crawl version by expanding only the prefixes whose responses differ from reference's names"""
+        print(f"\nExtracting names for {version} by diffing against {reference}...")
+        index = ReferenceIndex(self.results[reference])
+        store = self.results[version]
+        model = self.alphabet_models[version]
+        model.observe(index.names)  # Alphabet only; positions come from this version's responses
+        seeds = sorted(model.alphabet)
+        branches = ExpandedPrefixes(seeds)
+        adopted = 0
+        diverged = 0
+        
+        def expand(prefix, results, check):
+            nonlocal diverged
+            diverged += 1
+            children = child_prefixes(prefix, results, model.candidates(prefix))
+            branches.add(prefix, results)
+            if check is not None:
+                print(f"Prefix '{prefix}' differs from {reference} under '{check}', expanding {len(children)} children")
+            return children
+        
+        def adopt(prefix):
+            nonlocal adopted
+            names = store.add_many(index.under(prefix))
+            adopted += len(names)
+            print(f"Prefix '{prefix}' matches {reference}, adopted {len(names)} names. Total: {len(store)}")
+        
+        verifier = SpotCheckVerifier(
+            agrees=lambda prefix, results: len(prefix) >= verify_depth and index.matches(prefix, results),
+            spot_checks=lambda prefix, results: index.spot_checks(prefix, len(results), self.result_caps[version], spot_checks),
+            accept=adopt,
+            expand=expand,
+        )
+        
+        def handle_result(prefix, results):
+            if not isinstance(results, list):
+                return []
+            
+            new_names = store.add_many(results)
+            self.metrics.record_yield(version, len(prefix), len(results), len(new_names))
+            learned = self._learn(version, prefix, results)
+            children = branches.learned(learned)
+            children.extend(verifier.handle(prefix, results, is_saturated(results, self.result_caps[version])))
+            return children
+        
+        engine = AsyncCrawlEngine(self, concurrency=self.concurrency_for(version))
+        engine.run(version, seeds, handle_result)
+        
+        print(f"Differential approach completed for {version}. Prefixes expanded: {diverged}, "
+              f"names adopted from {reference}: {adopted}, total names found: {len(store)}")
+        return store
+    
+    def incremental_approach(self, version, previous, snapshot, spot_checks=2, max_age=7):
+        """
+        Refresh version against the previous run's fingerprints and names, descending only into changed subtrees.
+        Records what was added, removed and carried over unread in self.deltas[version].
+        """
+        print(f"\nRefreshing {version} against {len(previous)} fingerprints and {len(snapshot)} names...")
+        index = ReferenceIndex(snapshot)
+        store = self.results[version]
+        model = self.alphabet_models[version]
+        model.observe(index.names)  # Alphabet only; positions come from this run's responses
+        current = self.fingerprints[version]
+        current.runs = previous.runs
+        if not self.result_caps[version]:
+            self.result_caps[version] = max((value[1] for value in previous.prefixes.values()), default=None)
+        seeds = sorted(model.alphabet)
+        branches = ExpandedPrefixes(seeds)
+        read = set()  # Names some response of this run returned
+        unchanged = 0
+        changed = 0
+        
+        def expand(prefix, results, check):
+            nonlocal changed
+            changed += 1
+            children = child_prefixes(prefix, results, model.candidates(prefix))
+            branches.add(prefix, results)
+            where = f" under '{check}'" if check is not None else ""
+            print(f"Prefix '{prefix}' changed{where}, expanding {len(children)} children. Total: {len(store)}")
+            return children
+        
+        def keep(prefix):
+            nonlocal unchanged
+            unchanged += 1
+            store.add_many(index.under(prefix))
+            current.inherit(previous, prefix)
+        
+        verifier = SpotCheckVerifier(
+            agrees=lambda prefix, results: not previous.changed(prefix, results),
+            spot_checks=lambda prefix, results: previous.spot_checks(prefix, self.result_caps[version], spot_checks, max_age),
+            accept=keep,
+            expand=expand,
+        )
+        
+        def handle_result(prefix, results):
+            if not isinstance(results, list):
+                return []
+            
+            new_names = store.add_many(results)
+            read.update(results)
+            self.metrics.record_yield(version, len(prefix), len(results), len(new_names))
+            learned = self._learn(version, prefix, results)
+            children = branches.learned(learned)
+            children.extend(verifier.handle(prefix, results, is_saturated(results, self.result_caps[version])))
+            return children
+        
+        engine = AsyncCrawlEngine(self, concurrency=self.concurrency_for(version), refresh=True)
+        engine.run(version, seeds, handle_result)
+        
+        previous_names = set(index.names)
+        added = sorted(name for name in store if name not in previous_names)
+        removed = sorted(name for name in index.names if name not in store)
+        unverified = current.stale(self.result_caps[version])
+        unread = sum(1 for name in store if name not in read)
+        self.deltas[version] = {"added": added, "removed": removed, "unverified": unverified, "unverified_names": unread}
+        print(f"Incremental refresh completed for {version}. Prefixes changed: {changed}, unchanged subtrees kept: "
+              f"{unchanged}, names added: {len(added)}, removed: {len(removed)}, total: {len(store)}, "
+              f"copied unread from the snapshot: {unread} (oldest leaf fetched {max(unverified.values(), default=0)} runs ago)")
+        return store
+    
+    def load_previous(self, version):
+        """The previous run's fingerprints and names for version, or None if either is missing"""
+        fingerprints_path = f"{version}_fingerprints.json"
+        names_path = f"{version}_names.json"
+        if not (os.path.exists(fingerprints_path) and os.path.exists(names_path)):
             return None
+        with open(names_path, encoding="utf-8") as f:
+            return PrefixFingerprints.load(fingerprints_path), json.load(f)
+    
+    def bulk_approach(self, version, path):
+        """Retrieve every name of version from a bulk endpoint in one request"""
+        print(f"\nExtracting names for {version} from {path}...")
+        names = self.fetch_bulk(version, path)
+        if names is None:
+            print(f"{path} no longer returns names")
+            return None
+        self.results[version].add_many(names)
+        print(f"Bulk approach completed for {version}. Total names found: {len(self.results[version])}")
+        return self.results[version]
+    
+    def paged_approach(self, version, plan):
+        """
+        Page through each top-level prefix with the offset or page parameter of
+        plan (see capabilities.choose_plan) instead of splitting it into longer
+        prefixes, so every request past the first brings a page of new names.
+        A prefix whose pages stop bringing new names, e.g. because the server
+        limits how deep paging goes, is split into child prefixes, paged in turn.
+        """
+        print(f"\nExtracting names for {version} by paging {plan.get('offset_param') or plan.get('page_param')}...")
+        store = self.results[version]
+        model = self.alphabet_models[version]
+        base = plan["params"]
+        offset_param = plan.get("offset_param")
+        page_param = plan.get("page_param")
+        seeds = sorted(model.alphabet)
+        branches = ExpandedPrefixes(seeds)
+        pages = 0
+        splits = 0
+        
+        def handle_result(item, results):
+            nonlocal pages, splits
+            prefix, params = item
+            if not isinstance(results, list):
+                return []
             
-        # Try different endpoints
-        potential_endpoints = [
-            "/v3/autocomplete/all",
-            "/v3/names/all",
-            "/v3/autocomplete/dump",
-            "/v3/dump",
-            "/v3/names"
-        ]
-        
-        for endpoint in potential_endpoints:
-            url = f"{self.base_url}{endpoint}"
-            try:
-                print(f"Trying endpoint: {url}")
-                response = requests.get(url)
-                self.request_count["v3"] += 1
-                
-                if response.status_code == 200:
-                    print(f"✓ Found working endpoint: {endpoint}")
-                    try:
-                        data = response.json()
-                        if isinstance(data, list) and len(data) > 0:
-                            self.results["v3"] = set(data)
-                            print(f"Retrieved {len(data)} names from {endpoint}")
-                            return data
-                    except:
-                        print("Response is not valid JSON")
-            except:
-                pass
-                
-            time.sleep(self.rate_limit_wait)
+            pages += 1
+            new_names = store.add_many(results)
+            self.metrics.record_yield(version, len(prefix), len(results), len(new_names))
+            learned = model.observe(results)  # Alphabet only; pages aren't whole responses for their prefix
             
-        print("No special endpoints found for v3")
-        return None
+            children = [(child, base) for child in branches.learned(learned)]
+            if len(results) >= plan["page_size"]:
+                first = params == base
+                if not new_names and not first:
+                    # Paging stopped advancing, so split the prefix instead
+                    splits += 1
+                    children.extend((child, base) for child in child_prefixes(prefix, results, model.candidates(prefix)))
+                    branches.add(prefix, results)
+                elif offset_param:
+                    children.append((prefix, {**base, offset_param: params.get(offset_param, 0) + len(results)}))
+                else:
+                    children.append((prefix, {**base, page_param: params.get(page_param, plan["first_page"]) + 1}))
+            return children
+        
+        engine = AsyncCrawlEngine(self, concurrency=self.concurrency_for(version))
+        engine.run(version, [(char, base) for char in seeds], handle_result)
+        
+        print(f"Paged approach completed for {version}. Pages: {pages}, prefixes split: {splits}, "
+              f"total names found: {len(store)}")
+        return store
+    
+    def planned_approach(self, version, checkpoint=None):
+        """Extract version with its retrieval plan: a bulk endpoint, paging, or the prefix crawl"""
+        plan = self.retrieval_plan(version)
+        if plan["strategy"] == "bulk":
+            names = self.bulk_approach(version, plan["path"])
+            if names is not None:
+                return names
+            plan = {"strategy": "prefix", "params": {}}
+        if plan["strategy"] == "paged":
+            return self.paged_approach(version, plan)
+        return self.saturation_approach(version, checkpoint=checkpoint, params=plan["params"])
     
-    def run_extraction(self):
-        """Run the complete extraction process for all valid versions"""
+    def extract_version(self, version, resume=False, reference=None, incremental=False):
+        """
+        Crawl one version with the strategy suited to it, or by diffing against
+        reference if given. With incremental=True, a version with saved
+        fingerprints is refreshed against its previous run instead. A version
+        with a bulk endpoint is always read from it, and one that accepts page
+        parameters is extracted with them (see retrieval_plan).
+        """
+        start = time.perf_counter()
+        plan = self.retrieval_plan(version)
+        bulk = plan["strategy"] == "bulk"
+        previous = self.load_previous(version) if incremental and not bulk else None
+        if previous is not None:
+            self.incremental_approach(version, *previous)
+        elif reference is not None and not bulk:
+            # Differential crawls aren't journaled; the response cache makes re-running one cheap
+            self.differential_approach(version, reference)
+        elif version in ("v1", "v2") or plan["strategy"] != "prefix" or plan["params"]:
+            # Expand only saturated prefixes for v1 and v2, unless the plan found something cheaper
+            journaled = plan["strategy"] == "prefix"
+            checkpoint = CrawlCheckpoint(f"{version}_checkpoint.ndjson", resume=resume) if journaled else None
+            try:
+                self.planned_approach(version, checkpoint=checkpoint)
+            finally:
+                if checkpoint is not None:
+                    checkpoint.close()
+        else:
+            # Bulk endpoints were already tried by the capability probe
+            self.optimized_approach(version)
+        self.elapsed[version] = time.perf_counter() - start
+        print(f"[{version}] done in {self.elapsed[version]:.1f}s: {self.request_count[version]} requests, "
+              f"{len(self.results[version])} names")
+    
+    def extract_concurrently(self, versions, resume=False, reference=None, incremental=False):
+        """
+        Crawl versions at the same time, one thread each, so wall time follows the
+        slowest version rather than the sum. Each version keeps its own rate bucket
+        and connection limit; limits are cut to a fair share of max_connections so
+        the versions together never open more than that.
+        """
+        if not versions:
+            return
+        share = max(1, self.max_connections // len(versions))
+        for version in versions:
+            self.version_concurrency[version] = min(self.concurrency_for(version), share)
+        print(f"Crawling {', '.join(versions)} concurrently with "
+              f"{', '.join(f'{v}: {self.version_concurrency[v]}' for v in versions)} connections")
+        with ThreadPoolExecutor(max_workers=len(versions), thread_name_prefix="crawl") as pool:
+            futures = [pool.submit(self.extract_version, version, resume, reference, incremental) for version in versions]
+        for future in futures:
+            future.result()
+    
+    def stream_names(self, version, strategy="planned", buffer=64, **options):
+        """Start a NameStream crawling version with strategy (a key of STRATEGIES); options go to the strategy"""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}; choose from {', '.join(STRATEGIES)}")
+        method = getattr(self, STRATEGIES[strategy])
+        return NameStream(self, version, lambda: method(version, **options), buffer).start()
+    
+    def iter_names(self, version, strategy="planned", buffer=64, **options):
+        """
+        Yield version's names as the crawl finds them, without waiting for it to
+        finish. The crawl runs in a background thread and pauses while `buffer`
+        batches are waiting to be consumed. Stopping early (break, or closing
+        the generator) cancels the crawl. Names already in results[version]
+        are not yielded again.
+        """
+        stream = self.stream_names(version, strategy, buffer, **options)
+        try:
+            while (batch := stream.get()) is not None:
+                yield from batch
+        finally:
+            stream.close()
+    
+    async def aiter_names(self, version, strategy="planned", buffer=64, **options):
+        """
+        iter_names for asyncio; the event loop stays free while waiting for
+        names. Wrap it in contextlib.aclosing so that cancelling the consuming
+        task cancels the crawl straight away.
+        """
+        stream = self.stream_names(version, strategy, buffer, **options)
+        try:
+            while (batch := await asyncio.to_thread(stream.get)) is not None:
+                for name in batch:
+                    yield name
+        finally:
+            await asyncio.to_thread(stream.close)
+    
+    def run_extraction(self, resume=False, metrics_interval=10.0, differential=False, concurrent=False,
+                       incremental=False, max_seconds=None):
+        """
+        Run the complete extraction process for all valid versions.
+        Crawls are journaled to {version}_checkpoint.ndjson; with resume=True
+        they continue from the journal instead of starting over.
+        With differential=True, every version after the first is crawled by
+        diffing against the previous one (see differential_approach).
+        With concurrent=True, versions are crawled at the same time (see
+        extract_concurrently); combined with differential=True, the first
+        version is crawled alone and the others diff against it.
+        With incremental=True, versions saved by an earlier run are refreshed
+        against it (see incremental_approach), and the names added and removed
+        are written to {version}_delta.json.
+        With max_seconds, no request is sent after that many seconds; names
+        found by then are saved, and journaled crawls can be resumed.
+        Every metrics_interval seconds a live summary is printed and metrics are
+        exported to crawl_metrics.jsonl and crawl_metrics.prom.
+        """
+        if max_seconds is not None:
+            self.deadline = time.monotonic() + max_seconds
+        
         # First check which versions are supported
         self.test_versions()
         
-        for version in self.valid_versions:
-            if version == "v1":
-                # Use BFS approach for v1
-                self.bfs_approach(version)
-            elif version == "v2":
-                # Use parallel approach for v2
-                self.parallel_extraction(version, prefix_length=2)
-            elif version == "v3":
-                # Try to discover special endpoints for v3
-                v3_data = self.discover_v3_endpoint()
-                
-                # If no special endpoint, fall back to optimized approach
-                if not v3_data:
-                    self.optimized_approach(version)
+        reporter = None
+        if metrics_interval:
+            reporter = MetricsReporter(self.metrics, metrics_interval, "crawl_metrics.jsonl", "crawl_metrics.prom").start()
+        
+        if self.stream_dir is not None:
+            # Stream names to NDJSON as they are discovered
+            for version in self.valid_versions:
+                path = os.path.join(self.stream_dir, f"{version}_names.ndjson")
+                self.results[version].stream_to(path, append=resume)
+        
+        if concurrent:
+            versions = list(self.valid_versions)
+            reference = None
+            if differential and versions:
+                # The other versions diff against the first, so it has to finish first
+                reference = versions.pop(0)
+                self.extract_version(reference, resume, incremental=incremental)
+            self.extract_concurrently(versions, resume, reference, incremental)
+        else:
+            reference = None
+            for version in self.valid_versions:
+                self.extract_version(version, resume, reference if differential else None, incremental)
+                reference = version
+        
+        if reporter is not None:
+            reporter.stop()
+        if self.expired():
+            print(f"\nCrawl deadline of {max_seconds}s reached; results are partial")
         
         # Print statistics
         self.print_statistics()
+        for version in self.valid_versions:
+            self.results[version].close()
         
     def print_statistics(self):
         """Print statistics about the extraction process"""
         print("\n--- EXTRACTION STATISTICS ---")
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+        print(f"Single-flight: {self.single_flight.total_saved()} duplicate in-flight requests coalesced")
         for version in self.valid_versions:
             print(f"\n{version.upper()} Statistics:")
             print(f"- Total requests made: {self.request_count[version]}")
             print(f"- Total unique names found: {len(self.results[version])}")
+            if version in self.elapsed:
+                print(f"- Wall time: {self.elapsed[version]:.1f}s")
+            
+            stats = self.metrics.snapshot()["versions"].get(version)
+            if stats and stats["requests"]:
+                latency = stats["latency"]
+                print(f"- Latency p50/p95/p99: {latency['p50'] * 1000:.0f}/{latency['p95'] * 1000:.0f}/{latency['p99'] * 1000:.0f} ms")
+                print(f"- 429 responses: {stats['throttled']}, retries: {stats['retries']}, errors: {stats['errors']}, "
+                      f"timeouts: {stats['timeouts']}")
+                if stats["hedges"]:
+                    print(f"- Hedged requests: {stats['hedges']}, answered first: {stats['hedges_won']}")
+                print(f"- Bytes received: {stats['bytes_received']}")
             
             if self.results[version]:
-                print(f"- Sample names: {list(self.results[version])[:5]}")
+                print(f"- Sample names: {list(itertools.islice(self.results[version], 5))}")
         
         # Write results to files
+        if self.capabilities:
+            save_capabilities(self.capabilities, DEFAULT_CAPABILITIES_PATH)
         for version in self.valid_versions:
-            with open(f"{version}_names.json", "w") as f:
-                json.dump(list(self.results[version]), f, indent=2)
+            write_json_list(self.results[version], f"{version}_names.json")
             print(f"\nSaved {version} results to {version}_names.json")
+            if self.fingerprints[version]:
+                self.fingerprints[version].save(f"{version}_fingerprints.json")
+            if version in self.deltas:
+                with open(f"{version}_delta.json", "w", encoding="utf-8") as f:
+                    json.dump(self.deltas[version], f, indent=2)
+                print(f"Saved {version} changes to {version}_delta.json: {len(self.deltas[version]['added'])} added, "
+                      f"{len(self.deltas[version]['removed'])} removed, "
+                      f"{self.deltas[version]['unverified_names']} copied unread from the previous snapshot")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract every name from the autocomplete API")
+    parser.add_argument("--base-url", default="http://35.200.185.69:8000")
+    parser.add_argument("--resume", action="store_true", help="Continue journaled crawls instead of starting over")
+    parser.add_argument("--differential", action="store_true", help="Crawl later versions by diffing against the previous one")
+    parser.add_argument("--concurrent", action="store_true", help="Crawl versions at the same time")
+    parser.add_argument("--incremental", action="store_true", help="Refresh versions saved by an earlier run")
+    parser.add_argument("--hedge", action="store_true", help="Duplicate async requests that run past p95 latency")
+    parser.add_argument("--max-seconds", type=float, help="Stop sending requests after this many seconds")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between live metrics reports (0 for none)")
+    parser.add_argument("--stream", metavar="VERSION", help="Print VERSION's names, one per line, as they are found")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="planned", help="Strategy used with --stream")
+    args = parser.parse_args(argv)
+    
+    profile = DEFAULT_PROFILE_PATH if os.path.exists(DEFAULT_PROFILE_PATH) else None
+    capabilities = DEFAULT_CAPABILITIES_PATH if os.path.exists(DEFAULT_CAPABILITIES_PATH) else None
+    extractor = AutocompleteAPIExtractor(args.base_url, stream_dir=None if args.stream else ".",
+                                         rate_profile=profile, capabilities=capabilities)
+    extractor.hedge_requests = args.hedge
+    if args.stream:
+        # Names go to stdout; progress messages go to stderr so the output can be piped
+        if args.max_seconds is not None:
+            extractor.deadline = time.monotonic() + args.max_seconds
+        out = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            names = extractor.iter_names(args.stream, args.strategy)
+            try:
+                for name in names:
+                    print(name, file=out, flush=True)
+            except BrokenPipeError:
+                pass
+            finally:
+                names.close()
+        return
+    extractor.run_extraction(resume=args.resume, metrics_interval=args.metrics_interval,
+                             differential=args.differential, concurrent=args.concurrent,
+                             incremental=args.incremental, max_seconds=args.max_seconds)
 
-# Run the extraction
-extractor = AutocompleteAPIExtractor()
-extractor.run_extraction()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
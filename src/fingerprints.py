@@ -0,0 +1,103 @@
+import bisect
+import hashlib
+import math
+import json
+import os
+import time
+
+
+def fingerprint(results):
+    """Short hash of a response, sensitive to both its names and their order"""
+    return hashlib.sha1(json.dumps(results, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+class PrefixFingerprints:
+    """
+    Hash and size of every response a crawl received, by prefix.
+
+    Saved after each run, they let the next run tell which subtrees changed by
+    re-querying a prefix and comparing, instead of crawling everything again.
+    runs counts the saves, and each record notes the run that last fetched
+    it, so a refresh can tell how stale a carried-over subtree is and re-check
+    the stalest leaves first.
+    """
+    def __init__(self, prefixes=None, runs=0):
+        self.prefixes = dict(prefixes or {})  # prefix -> (hash, result count, run last fetched)
+        self.runs = runs
+        self._keys = None
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    def get(self, prefix):
+        return self.prefixes.get(prefix)
+
+    def record(self, prefix, results):
+        self.prefixes[prefix] = (fingerprint(results), len(results), self.runs)
+        self._keys = None
+
+    def changed(self, prefix, results):
+        """Whether results differ from the response recorded for prefix, or none was recorded"""
+        recorded = self.prefixes.get(prefix)
+        return recorded is None or recorded[:2] != (fingerprint(results), len(results))
+
+    def age(self, prefix):
+        """Runs since prefix's response was last fetched"""
+        return self.runs - self.prefixes[prefix][2]
+
+    def stale(self, result_cap):
+        """Recorded complete responses carried over from an earlier run, with their age"""
+        return {prefix: self.age(prefix) for prefix, (_, count, fetched) in self.prefixes.items()
+                if fetched < self.runs and count < result_cap}
+
+    def _under(self, prefix):
+        """Recorded prefixes strictly below prefix, sorted"""
+        if self._keys is None:
+            self._keys = sorted(self.prefixes)
+        start = bisect.bisect_right(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + chr(0x10FFFF), start)
+        return self._keys[start:end]
+
+    def inherit(self, previous, prefix):
+        """Carry over previous's records below prefix that this run didn't re-query"""
+        for key in previous._under(prefix):
+            if key not in self.prefixes:
+                self.prefixes[key] = previous.prefixes[key]
+        self._keys = None
+
+    def spot_checks(self, prefix, result_cap, count=2, max_age=None):
+        """
+        Recorded complete (unsaturated) responses below prefix to re-check:
+        the count stalest, or enough that re-checking as many every run
+        fetches each of them at least once every max_age runs. Among equally
+        stale leaves the pick starts one slot further on each run.
+        """
+        leaves = [key for key in self._under(prefix) if self.prefixes[key][1] < result_cap]
+        if not leaves or not count:
+            return []
+        if max_age:
+            count = max(count, math.ceil(len(leaves) / max_age))
+        order = sorted(range(len(leaves)), key=lambda i: (self.prefixes[leaves[i]][2], (i - self.runs) % len(leaves)))
+        return sorted(leaves[i] for i in order[:count])
+
+    def save(self, path):
+        """Write atomically, so an interrupted save keeps the previous run's fingerprints"""
+        data = {
+            "runs": self.runs + 1,
+            "saved_at": time.time(),
+            "prefixes": {prefix: list(value) for prefix, value in sorted(self.prefixes.items())},
+        }
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        runs = data.get("runs", 0)
+        # Files written before records carried their run were all fetched by the run that saved them
+        prefixes = {prefix: tuple(value) if len(value) == 3 else (*value, runs - 1)
+                    for prefix, value in data["prefixes"].items()}
+        return cls(prefixes, runs)
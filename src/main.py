@@ -1,20 +1,23 @@
 import requests
 import time
 import json
+from functools import partial
+from response_cache import DEFAULT_TIMEOUT, ResponseCache, cached_get
 
-def test_autocomplete(base_url, version, query):
-    url = f"{base_url}/{version}/autocomplete?query={query}"
+def test_autocomplete(base_url, version, query, cache=None, timeout=DEFAULT_TIMEOUT):
+    """timeout is the (connect, read) timeout in seconds"""
     try:
-        response = requests.get(url)
+        response = cached_get(cache, partial(requests.get, timeout=timeout), base_url, version, query)
         response.raise_for_status()  # Raise exception for HTTP errors
         return response.json()
     except requests.exceptions.RequestException as e:
         print(f"Error calling API: {e}")
         return None
 
-# Base URL
-base_url = "http://35.200.185.69:8000"
+if __name__ == "__main__":
+    # Base URL
+    base_url = "http://35.200.185.69:8000"
 
-# Test with a simple query
-result = test_autocomplete(base_url, "v1", "a")
-print(json.dumps(result, indent=2))
\ No newline at end of file
+    # Test with a simple query
+    result = test_autocomplete(base_url, "v1", "a", cache=ResponseCache())
+    print(json.dumps(result, indent=2))
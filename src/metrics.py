@@ -0,0 +1,262 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: O(1) to record, about 5% relative error
+    on percentiles, fixed memory regardless of request count
+    """
+    MIN_LATENCY = 1e-4
+    GROWTH = 1.1
+    BUCKETS = 200
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= self.MIN_LATENCY:
+            index = 0
+        else:
+            index = min(self.BUCKETS - 1, int(math.log(seconds / self.MIN_LATENCY, self.GROWTH)) + 1)
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (p in 0..100)"""
+        if not self.total:
+            return 0.0
+        rank = math.ceil(self.total * p / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, self.MIN_LATENCY * self.GROWTH ** index)
+        return self.max
+
+
+class CrawlMetrics:
+    """
+    Thread-safe counters for the request hot path and the crawl strategies:
+    per-version latency histograms, status codes, retries, errors, bytes
+    received, names-per-request yield by prefix depth, queue depth,
+    timeouts, hedged requests and effective requests/second over a sliding
+    window.
+    """
+    def __init__(self, rps_window=10.0):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.rps_window = rps_window
+        self.latency = {}
+        self.status_counts = {}
+        self.retries = Counter()
+        self.errors = Counter()
+        self.timeouts = Counter()
+        self.hedges = Counter()  # Duplicate requests sent for slow ones
+        self.hedges_won = Counter()  # Hedges that answered before the original
+        self.bytes_received = Counter()
+        self.yields = {}  # version -> depth -> [requests, results, new names]
+        self.queue_depth = {}
+        self.max_queue_depth = Counter()
+        self.recent = {}  # version -> deque of request completion times
+
+    def record_request(self, version, seconds, status, nbytes=0):
+        """Record one HTTP attempt; status is the HTTP status code"""
+        now = time.monotonic()
+        with self.lock:
+            self.latency.setdefault(version, LatencyHistogram()).record(seconds)
+            self.status_counts.setdefault(version, Counter())[status] += 1
+            self.bytes_received[version] += nbytes
+            recent = self.recent.setdefault(version, deque())
+            recent.append(now)
+            while recent and now - recent[0] > self.rps_window:
+                recent.popleft()
+
+    def record_retry(self, version):
+        with self.lock:
+            self.retries[version] += 1
+
+    def record_error(self, version):
+        """A request that failed without an HTTP response, other than a timeout"""
+        with self.lock:
+            self.errors[version] += 1
+
+    def record_timeout(self, version):
+        """A request that ran past its connect or read timeout"""
+        with self.lock:
+            self.timeouts[version] += 1
+
+    def record_hedge(self, version, won):
+        """A duplicate sent for a slow request; won means the duplicate answered first"""
+        with self.lock:
+            self.hedges[version] += 1
+            if won:
+                self.hedges_won[version] += 1
+
+    def latency_percentile(self, version, p, min_samples=1):
+        """p-th percentile latency of version in seconds, or None before min_samples requests"""
+        with self.lock:
+            histogram = self.latency.get(version)
+            if histogram is None or histogram.total < min_samples:
+                return None
+            return histogram.percentile(p)
+
+    def record_yield(self, version, depth, results, new_names):
+        """Result count and new names returned for one prefix of the given depth"""
+        with self.lock:
+            stats = self.yields.setdefault(version, {}).setdefault(depth, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += results
+            stats[2] += new_names
+
+    def record_queue_depth(self, version, depth):
+        with self.lock:
+            self.queue_depth[version] = depth
+            self.max_queue_depth[version] = max(self.max_queue_depth[version], depth)
+
+    def effective_rps(self, version):
+        now = time.monotonic()
+        with self.lock:
+            recent = self.recent.get(version, ())
+            count = sum(1 for t in recent if now - t <= self.rps_window)
+        window = min(self.rps_window, max(time.time() - self.started, 1e-9))
+        return count / window
+
+    def snapshot(self):
+        """Machine-readable view of every metric"""
+        versions = sorted(set(self.latency) | set(self.yields) | set(self.queue_depth))
+        rps = {version: self.effective_rps(version) for version in versions}
+        with self.lock:
+            data = {"time": time.time(), "elapsed": time.time() - self.started, "versions": {}}
+            for version in versions:
+                histogram = self.latency.get(version, LatencyHistogram())
+                statuses = self.status_counts.get(version, Counter())
+                data["versions"][version] = {
+                    "requests": histogram.total,
+                    "latency": {
+                        "p50": histogram.percentile(50),
+                        "p95": histogram.percentile(95),
+                        "p99": histogram.percentile(99),
+                        "max": histogram.max,
+                        "mean": histogram.sum / histogram.total if histogram.total else 0.0,
+                    },
+                    "status_counts": {str(status): count for status, count in sorted(statuses.items())},
+                    "throttled": statuses.get(429, 0),
+                    "retries": self.retries[version],
+                    "errors": self.errors[version],
+                    "timeouts": self.timeouts[version],
+                    "hedges": self.hedges[version],
+                    "hedges_won": self.hedges_won[version],
+                    "bytes_received": self.bytes_received[version],
+                    "effective_rps": rps[version],
+                    "queue_depth": self.queue_depth.get(version, 0),
+                    "max_queue_depth": self.max_queue_depth[version],
+                    "new_names": sum(stats[2] for stats in self.yields.get(version, {}).values()),
+                    "yield_by_depth": {
+                        str(depth): {
+                            "prefixes": prefixes,
+                            "results_per_request": results / prefixes,
+                            "new_names_per_request": new_names / prefixes,
+                        }
+                        for depth, (prefixes, results, new_names) in sorted(self.yields.get(version, {}).items())
+                    },
+                }
+        return data
+
+    def summary(self):
+        """One line per version for the live progress report"""
+        lines = []
+        for version, stats in self.snapshot()["versions"].items():
+            latency = stats["latency"]
+            lines.append(
+                f"[{version}] {stats['requests']} req, {stats['effective_rps']:.1f} req/s, "
+                f"p50/p95/p99 {latency['p50'] * 1000:.0f}/{latency['p95'] * 1000:.0f}/{latency['p99'] * 1000:.0f} ms, "
+                f"429s {stats['throttled']}, retries {stats['retries']}, errors {stats['errors']}, "
+                f"timeouts {stats['timeouts']}, hedges {stats['hedges_won']}/{stats['hedges']} won, "
+                f"queue {stats['queue_depth']}, names {stats['new_names']}"
+            )
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP autocomplete_{name} {help_text}")
+            lines.append(f"# TYPE autocomplete_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"autocomplete_{name}{{{label_str}}} {value}")
+
+        versions = self.snapshot()["versions"]
+        metric("request_latency_seconds", "summary", "Request latency", [
+            ({"version": v, "quantile": q}, s["latency"][key])
+            for v, s in versions.items() for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+        ])
+        metric("requests_total", "counter", "HTTP attempts by status code", [
+            ({"version": v, "status": status}, count)
+            for v, s in versions.items() for status, count in s["status_counts"].items()
+        ])
+        metric("retries_total", "counter", "Retried requests", [({"version": v}, s["retries"]) for v, s in versions.items()])
+        metric("errors_total", "counter", "Requests without an HTTP response", [({"version": v}, s["errors"]) for v, s in versions.items()])
+        metric("timeouts_total", "counter", "Requests that ran past their timeout", [({"version": v}, s["timeouts"]) for v, s in versions.items()])
+        metric("hedges_total", "counter", "Duplicate requests sent for slow ones", [({"version": v}, s["hedges"]) for v, s in versions.items()])
+        metric("hedges_won_total", "counter", "Hedges that answered before the original", [({"version": v}, s["hedges_won"]) for v, s in versions.items()])
+        metric("bytes_received_total", "counter", "Response bytes received", [({"version": v}, s["bytes_received"]) for v, s in versions.items()])
+        metric("effective_rps", "gauge", "Requests per second over the recent window", [({"version": v}, s["effective_rps"]) for v, s in versions.items()])
+        metric("queue_depth", "gauge", "Prefixes waiting to be queried", [({"version": v}, s["queue_depth"]) for v, s in versions.items()])
+        metric("new_names_per_request", "gauge", "New names per request by prefix depth", [
+            ({"version": v, "depth": depth}, y["new_names_per_request"])
+            for v, s in versions.items() for depth, y in s["yield_by_depth"].items()
+        ])
+        return "\n".join(lines) + "\n"
+
+    def export(self, jsonl_path=None, prometheus_path=None):
+        """Append a snapshot to a JSON lines file and/or rewrite a Prometheus textfile"""
+        if jsonl_path:
+            with open(jsonl_path, "a") as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+        if prometheus_path:
+            tmp_path = f"{prometheus_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, prometheus_path)
+
+
+class MetricsReporter:
+    """Background thread that prints a live summary and exports metrics every interval seconds"""
+    def __init__(self, metrics, interval=10.0, jsonl_path=None, prometheus_path=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self):
+        summary = self.metrics.summary()
+        if summary:
+            print(summary)
+        self.metrics.export(self.jsonl_path, self.prometheus_path)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and write a final report"""
+        self.stopped.set()
+        self.thread.join()
+        self.report()
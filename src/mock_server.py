@@ -0,0 +1,244 @@
+import argparse
+import bisect
+import json
+import random
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def generate_corpus(size=2000, seed=0, alphabet=string.ascii_lowercase, min_length=3, max_length=10):
+    """Deterministic random name corpus, sorted and de-duplicated"""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < size:
+        length = rng.randint(min_length, max_length)
+        names.add("".join(rng.choice(alphabet) for _ in range(length)))
+    return sorted(names)
+
+
+class MockAutocompleteServer:
+    """
+    Local stand-in for the autocomplete API serving /v1|v2|v3/autocomplete.
+
+    Each version returns the first result_caps[version] names of its corpus that
+    start with the query, in sorted or shuffled order, after `latency` seconds
+    (plus up to `jitter`). When rate_limits[version] = (requests/second, burst)
+    is set, requests over the budget get a 429 with a Retry-After header.
+    limit_window picks how the budget refills: "bucket" (a token bucket,
+    continuously) or "fixed" (burst requests per fixed window of burst/rps seconds).
+    paging[version] makes that version honour page parameters: "max_limit" lets
+    `limit` raise the page size up to that many names, "offset" enables
+    `offset` and "page" enables 1-based `page`. bulk_paths[version] serves the
+    whole corpus at that path (e.g. "/v3/names"). slow = (fraction, seconds)
+    stalls that fraction of requests for that many extra seconds, like a
+    stuck backend.
+    """
+    def __init__(self, corpora=None, result_caps=None, latency=0.02, jitter=0.01,
+                 rate_limits=None, ordering="sorted", host="127.0.0.1", port=0, seed=0, limit_window="bucket",
+                 paging=None, bulk_paths=None, slow=None):
+        if corpora is None:
+            corpora = generate_corpus(seed=seed)
+        if not isinstance(corpora, dict):
+            corpora = {version: corpora for version in ("v1", "v2", "v3")}
+        self.corpora = {version: sorted(names) for version, names in corpora.items()}
+        self.keys = {version: [name.lower() for name in names] for version, names in self.corpora.items()}
+        self.result_caps = result_caps or {"v1": 20, "v2": 25, "v3": 30}
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = rate_limits or {}
+        self.limit_window = limit_window
+        self.paging = paging or {}
+        self.slow = slow
+        self.bulk_paths = {path: version for version, path in (bulk_paths or {}).items()}
+        self.ordering = ordering
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.request_count = {version: 0 for version in self.corpora}
+        self.throttled_count = {version: 0 for version in self.corpora}
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def lookup(self, version, query, params=None):
+        """
+        Names the server returns for a query, before latency and rate limiting.
+        Raises ValueError for a non-integer page parameter the version honours.
+        """
+        keys = self.keys[version]
+        query = query.lower()
+        params = params or {}
+        cap = self.result_caps.get(version, 10)
+        options = self.paging.get(version, {})
+        if options.get("max_limit") and "limit" in params:
+            cap = max(0, min(int(params["limit"]), options["max_limit"]))
+        skip = 0
+        if options.get("offset") and "offset" in params:
+            skip = max(0, int(params["offset"]))
+        elif options.get("page") and "page" in params:
+            skip = max(0, int(params["page"]) - 1) * cap
+        start = bisect.bisect_left(keys, query) + skip
+        matches = []
+        for i in range(start, len(keys)):
+            if not keys[i].startswith(query) or len(matches) >= cap:
+                break
+            matches.append(self.corpora[version][i])
+        if self.ordering == "shuffled":
+            with self.lock:
+                self.rng.shuffle(matches)
+        return matches
+
+    def _admit(self, version):
+        """Rate limit check; returns seconds until a request would be admitted, or 0 if admitted"""
+        limit = self.rate_limits.get(version)
+        if not limit:
+            return 0
+        rate, burst = limit
+        with self.lock:
+            now = time.monotonic()
+            if self.limit_window == "fixed":
+                window = burst / rate
+                index = int(now // window)
+                used, current = self.buckets.get(version, (0, index))
+                used = used if current == index else 0
+                if used < burst:
+                    self.buckets[version] = (used + 1, index)
+                    return 0
+                return (index + 1) * window - now
+            tokens, updated = self.buckets.get(version, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self.buckets[version] = (tokens - 1, now)
+                return 0
+            self.buckets[version] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up on the request (timeout or a hedge answered first)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip("/") in server.bulk_paths:
+                    version = server.bulk_paths[url.path.rstrip("/")]
+                    with server.lock:
+                        server.request_count[version] += 1
+                    self._send(200, server.corpora[version])
+                    return
+                parts = url.path.strip("/").split("/")
+                if len(parts) != 2 or parts[0] not in server.corpora or parts[1] != "autocomplete":
+                    self._send(404, {"detail": "Not Found"})
+                    return
+                version = parts[0]
+                params = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+                if "query" not in params:
+                    self._send(422, {"detail": "query is required"})
+                    return
+
+                with server.lock:
+                    server.request_count[version] += 1
+                retry_after = server._admit(version)
+                if retry_after:
+                    with server.lock:
+                        server.throttled_count[version] += 1
+                    self._send(429, {"detail": "Too Many Requests"}, {"Retry-After": f"{retry_after:.3f}"})
+                    return
+
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + server.rng.random() * server.jitter)
+                if server.slow and server.rng.random() < server.slow[0]:
+                    time.sleep(server.slow[1])
+                query = params.pop("query")
+                try:
+                    self._send(200, server.lookup(version, query, params))
+                except ValueError:
+                    self._send(422, {"detail": "page parameters must be integers"})
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread and return the base URL"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the autocomplete API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--names", type=int, default=2000, help="Size of the generated corpus")
+    parser.add_argument("--corpus", help="JSON file with a list of names to serve instead")
+    parser.add_argument("--cap", type=int, action="append", help="Result cap for v1, v2, v3 (repeat in order)")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--rps", type=float, help="Per-version rate limit in requests/second")
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--limit-window", choices=["bucket", "fixed"], default="bucket")
+    parser.add_argument("--ordering", choices=["sorted", "shuffled"], default="sorted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-limit", type=int, help="Honour a `limit` parameter up to this page size")
+    parser.add_argument("--offset", action="store_true", help="Honour an `offset` parameter")
+    parser.add_argument("--page", action="store_true", help="Honour a 1-based `page` parameter")
+    parser.add_argument("--bulk", action="store_true", help="Serve every name at /{version}/names")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="Fraction of requests that stall")
+    parser.add_argument("--slow-seconds", type=float, default=5.0, help="Extra seconds a stalled request takes")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = json.load(f)
+    else:
+        corpus = generate_corpus(args.names, args.seed)
+    caps = dict(zip(("v1", "v2", "v3"), args.cap)) if args.cap else None
+    limits = {v: (args.rps, args.burst) for v in ("v1", "v2", "v3")} if args.rps else None
+    paging = {"max_limit": args.max_limit, "offset": args.offset, "page": args.page}
+    paging = {v: paging for v in ("v1", "v2", "v3")} if any(paging.values()) else None
+    bulk_paths = {v: f"/{v}/names" for v in ("v1", "v2", "v3")} if args.bulk else None
+
+    server = MockAutocompleteServer(corpus, caps, args.latency, args.jitter, limits,
+                                    args.ordering, port=args.port, seed=args.seed, limit_window=args.limit_window,
+                                    paging=paging, bulk_paths=bulk_paths,
+                                    slow=(args.slow_fraction, args.slow_seconds) if args.slow_fraction else None)
+    print(f"Serving {len(corpus)} names on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
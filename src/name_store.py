@@ -0,0 +1,248 @@
+import bisect
+import itertools
+import json
+import mmap
+import operator
+import os
+import struct
+import threading
+from array import array
+
+MAGIC = b"NAMESTR2"
+MAGIC_V1 = b"NAMESTR1"  # Written before prefix keys were stored; keys are rebuilt on open
+
+
+def _key(encoded):
+    """First 8 bytes of an encoded name as an integer; keys sort like the names they come from"""
+    return int.from_bytes(encoded[:8].ljust(8, b"\0"), "big")
+
+
+def _compare(blob, start, end, encoded):
+    """Compare blob[start:end] with encoded (-1, 0 or 1) without copying either"""
+    length = end - start
+    for i in range(min(length, len(encoded))):
+        a, b = blob[start + i], encoded[i]
+        if a != b:
+            return -1 if a < b else 1
+    return (length > len(encoded)) - (length < len(encoded))
+
+
+def _bisect(blob, offsets, keys, encoded, lo=0):
+    """
+    Index of the first stored name not below encoded. The prefix keys narrow
+    it down in C; full names are only compared among those sharing the key.
+    """
+    key = _key(encoded)
+    lo = bisect.bisect_left(keys, key, lo)
+    if lo == len(keys) or keys[lo] != key:
+        return lo
+    hi = bisect.bisect_right(keys, key, lo)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _compare(blob, offsets[mid], offsets[mid + 1], encoded) < 0:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class NameStore:
+    """
+    Compact, de-duplicating set of names.
+
+    Names are kept as one sorted UTF-8 blob plus arrays of offsets and 8-byte
+    prefix keys, which costs roughly len(name) + 16 bytes per name instead of
+    a str object and a set slot. Recent additions are held pending, with the
+    position each will take, and merged into the blob in one pass once they
+    grow past a fraction of the store. When streaming is enabled
+    (stream_path or stream_to), every newly discovered name is appended to the
+    stream as an NDJSON line. Callables in listeners are called with each
+    non-empty list of new names, outside the lock; a listener that blocks
+    holds back the caller that added them.
+    """
+    def __init__(self, stream_path=None, merge_threshold=20_000):
+        self.blob = b""
+        self.offsets = array("Q", [0])
+        self.keys = array("Q")  # _key of each stored name, searched before the blob
+        self.pending = {}  # name -> where it goes among the stored names, found by the membership check
+        self.merge_threshold = merge_threshold
+        self.lock = threading.Lock()
+        self.mmap = None
+        self.stream = None
+        self.listeners = []
+        if stream_path:
+            self.stream_to(stream_path)
+
+    def stream_to(self, path, append=False):
+        """
+        Start appending newly discovered names to an NDJSON file. With
+        append=True, names already in the file are loaded first so they
+        are not streamed twice.
+        """
+        self.close()
+        if append and os.path.exists(path):
+            self.add_many(read_ndjson(path), stream=False)
+        self.stream = open(path, "a" if append else "w", encoding="utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.pending)
+
+    def _find(self, encoded):
+        """Index where encoded is or would go among the stored names, and whether it is there"""
+        i = _bisect(self.blob, self.offsets, self.keys, encoded)
+        return i, i < len(self.keys) and _compare(self.blob, self.offsets[i], self.offsets[i + 1], encoded) == 0
+
+    def __contains__(self, name):
+        with self.lock:
+            return name in self.pending or self._find(name.encode())[1]
+
+    def _merge(self):
+        """
+        Fold pending names into the sorted blob. Only pending is sorted; runs
+        of stored names between their insertion points are copied whole, so no
+        per-name objects are made and the peak is the old and new blobs.
+        """
+        pending = sorted((name.encode(), index) for name, index in self.pending.items())
+        old_blob, old_offsets, old_keys = memoryview(self.blob), self.offsets, self.keys
+        count = len(old_offsets) - 1
+        blob = bytearray(old_offsets[count] + sum(len(encoded) for encoded, _ in pending))
+        offsets = array("Q", [0])
+        keys = array("Q")
+        position = 0  # Bytes written to blob
+        copied = 0  # Stored names copied so far
+        for encoded, stop in pending + [(None, count)]:
+            if stop > copied:
+                start, end = old_offsets[copied], old_offsets[stop]
+                blob[position:position + end - start] = old_blob[start:end]
+                offsets.extend(map(operator.add, old_offsets[copied + 1:stop + 1], itertools.repeat(position - start)))
+                keys.extend(old_keys[copied:stop])
+                position += end - start
+                copied = stop
+            if encoded is not None:
+                blob[position:position + len(encoded)] = encoded
+                position += len(encoded)
+                offsets.append(position)
+                keys.append(_key(encoded))
+        self.blob = blob
+        self.offsets = offsets
+        self.keys = keys
+        self.pending = {}
+        self.mmap = None  # Unmapped once no iterator still holds a view of it
+
+    def add_many(self, names, stream=True):
+        """
+        Add names and return the ones that were not already present, in input order.
+        stream=False skips the NDJSON stream, e.g. when restoring names already written.
+        """
+        new_names = []
+        with self.lock:
+            for name in names:
+                if name in self.pending:
+                    continue
+                index, found = self._find(name.encode())
+                if found:
+                    continue
+                self.pending[name] = index
+                new_names.append(name)
+            if len(self.pending) > max(self.merge_threshold, (len(self.offsets) - 1) // 8):
+                self._merge()
+            if stream and self.stream is not None and new_names:
+                self.stream.write("".join(json.dumps(name) + "\n" for name in new_names))
+                self.stream.flush()
+        if new_names:
+            for listener in list(self.listeners):
+                listener(new_names)
+        return new_names
+
+    # set-compatible spelling used by callers that don't need the new names
+    update = add_many
+
+    def add(self, name):
+        """Add one name; returns True if it was new"""
+        return bool(self.add_many([name]))
+
+    def __iter__(self):
+        """Iterate names in sorted order"""
+        with self.lock:
+            blob, offsets = self.blob, self.offsets
+            pending = sorted(self.pending, key=lambda name: name.encode())
+        stored = (bytes(blob[offsets[i]:offsets[i + 1]]).decode() for i in range(len(offsets) - 1))
+        return _merge_sorted(stored, pending)
+
+    def save(self, path):
+        """Write the compact form to disk so it can be memory-mapped with NameStore.open"""
+        with self.lock:
+            if self.pending:
+                self._merge()
+            with open(path, "wb") as f:
+                f.write(MAGIC)
+                f.write(struct.pack("<Q", len(self.offsets)))
+                f.write(self.offsets.tobytes())
+                f.write(self.keys.tobytes())
+                f.write(self.blob)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a store written by save(); new additions are kept in memory"""
+        store = cls()
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = mapped[:len(MAGIC)]
+        if magic not in (MAGIC, MAGIC_V1):
+            mapped.close()
+            raise ValueError(f"{path} is not a NameStore file")
+        count = struct.unpack_from("<Q", mapped, len(MAGIC))[0]
+        start = len(MAGIC) + 8
+        view = memoryview(mapped)
+        store.offsets = view[start:start + count * 8].cast("Q")
+        start += count * 8
+        if magic == MAGIC:
+            store.keys = view[start:start + (count - 1) * 8].cast("Q")
+            start += (count - 1) * 8
+        store.blob = view[start:]
+        if magic == MAGIC_V1:
+            offsets = store.offsets
+            store.keys = array("Q", (_key(bytes(store.blob[offsets[i]:min(offsets[i] + 8, offsets[i + 1])]))
+                                     for i in range(count - 1)))
+        store.mmap = mapped
+        return store
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+def _merge_sorted(stored, pending):
+    """Merge two sorted name iterables by UTF-8 byte order"""
+    pending = iter(pending)
+    next_pending = next(pending, None)
+    for name in stored:
+        while next_pending is not None and next_pending.encode() < name.encode():
+            yield next_pending
+            next_pending = next(pending, None)
+        yield name
+    if next_pending is not None:
+        yield next_pending
+        yield from pending
+
+
+def read_ndjson(path):
+    """Yield names from an NDJSON stream, skipping a torn final line"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def write_json_list(names, path):
+    """Stream names to a JSON list file (indent=2 layout) without building a list in memory"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        separator = "\n  "
+        for name in names:
+            f.write(separator + json.dumps(name))
+            separator = ",\n  "
+        f.write("\n]" if separator == ",\n  " else "]")
@@ -0,0 +1,71 @@
+import queue
+import threading
+
+
+class NameStream:
+    """
+    Runs one version's crawl in a background thread and hands over the names
+    it discovers, a batch (one response's new names) at a time.
+
+    Batches wait in a queue of at most `buffer` entries; once it is full the
+    crawl blocks until the consumer catches up, so a slow consumer holds the
+    crawl back instead of filling memory. close() cancels the crawl: no
+    further requests are sent for the version and the thread is joined.
+    """
+    _DONE = object()
+
+    def __init__(self, extractor, version, crawl, buffer=64):
+        self.extractor = extractor
+        self.version = version
+        self.crawl = crawl  # Called with no arguments; adds names to extractor.results[version]
+        self.batches = queue.Queue(maxsize=buffer)
+        self.stopped = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name=f"names-{version}", daemon=True)
+
+    def _put(self, item):
+        """Queue item, waiting while the queue is full unless the stream is closed"""
+        while not self.stopped.is_set():
+            try:
+                self.batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        try:
+            self.crawl()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(self._DONE)
+
+    def start(self):
+        self.extractor.results[self.version].listeners.append(self._put)
+        self.thread.start()
+        return self
+
+    def get(self):
+        """Next batch of names, or None once the crawl has finished or the stream is closed"""
+        while not self.stopped.is_set():
+            try:
+                batch = self.batches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch is self._DONE:
+                if self.error is not None:
+                    raise self.error
+                return None
+            return batch
+        return None
+
+    def close(self):
+        """Cancel the crawl if it is still running and wait for its thread"""
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.extractor.cancelled.add(self.version)
+            self.thread.join()
+            self.extractor.cancelled.discard(self.version)
+        listeners = self.extractor.results[self.version].listeners
+        if self._put in listeners:
+            listeners.remove(self._put)
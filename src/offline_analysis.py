@@ -0,0 +1,148 @@
+import json
+import os
+from itertools import combinations
+
+import numpy as np
+
+from name_store import NameStore, read_ndjson
+
+
+def load_names(source):
+    """
+    Names from an iterable, a {version}_names.json list, an NDJSON stream or a
+    file written by NameStore.save
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return list(source)
+    path = os.fspath(source)
+    if path.endswith(".ndjson"):
+        return list(read_ndjson(path))
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return list(NameStore.open(path))
+
+
+def name_array(names):
+    """Unique names as a sorted NumPy unicode array"""
+    return np.unique(np.array(list(names), dtype=str))
+
+
+def code_points(names, max_positions=32):
+    """(names x positions) matrix of Unicode code points, 0 past the end of a name"""
+    if not len(names):
+        return np.zeros((0, max_positions), dtype=np.uint32)
+    width = min(max_positions, names.dtype.itemsize // 4)
+    return np.ascontiguousarray(names.astype(f"<U{width}")).view(np.uint32).reshape(len(names), width)
+
+
+def length_distribution(names):
+    """Histogram and summary statistics of name lengths"""
+    lengths = np.char.str_len(names) if len(names) else np.zeros(0, dtype=int)
+    if not len(lengths):
+        return {"count": 0, "histogram": {}}
+    histogram = np.bincount(lengths)
+    present = np.flatnonzero(histogram)
+    return {
+        "count": int(len(lengths)),
+        "min": int(lengths.min()),
+        "max": int(lengths.max()),
+        "mean": float(lengths.mean()),
+        "median": float(np.median(lengths)),
+        "p95": float(np.percentile(lengths, 95)),
+        "histogram": {int(length): int(histogram[length]) for length in present},
+    }
+
+
+def position_frequencies(codes):
+    """Character counts at each position: {position: {char: count}}"""
+    positions = np.broadcast_to(np.arange(codes.shape[1], dtype=np.int64), codes.shape)
+    mask = codes != 0
+    # One unique() over (position, code point) pairs packed into a single integer
+    keys, counts = np.unique((positions[mask] << 21) | codes[mask].astype(np.int64), return_counts=True)
+    frequencies = {}
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        frequencies.setdefault(key >> 21, {})[chr(key & 0x1FFFFF)] = count
+    return frequencies
+
+
+def prefix_statistics(entries, result_cap=None, detail_depth=2):
+    """
+    Result counts and cap saturation by prefix depth from cached responses,
+    given as (query, results) pairs. The cap defaults to the largest response.
+    Prefixes up to detail_depth long are also listed individually.
+    """
+    entries = [(query, results) for query, results in entries if isinstance(results, list)]
+    if not entries:
+        return {"prefixes": 0}
+    queries = np.array([query.lower() for query, _ in entries], dtype=str)
+    counts = np.array([len(results) for _, results in entries])
+    depths = np.char.str_len(queries)
+    cap = result_cap or int(counts.max())
+    saturated = counts >= cap
+
+    # Every result starts with its query: compare each result to its query, all at once
+    owners = np.repeat(np.arange(len(entries)), counts)
+    flat = np.array([name.lower() for _, results in entries for name in results], dtype=str)
+    starts_with_query = bool(np.all(np.char.startswith(flat, queries[owners]))) if len(flat) else True
+
+    prefixes = np.bincount(depths)
+    totals = np.bincount(depths, weights=counts)
+    saturations = np.bincount(depths, weights=saturated)
+    by_depth = {
+        int(depth): {
+            "prefixes": int(prefixes[depth]),
+            "mean_results": float(totals[depth] / prefixes[depth]),
+            "saturation_rate": float(saturations[depth] / prefixes[depth]),
+        }
+        for depth in np.flatnonzero(prefixes)
+    }
+    detail = depths <= detail_depth
+    return {
+        "prefixes": int(len(entries)),
+        "result_cap": cap,
+        "saturation_rate": float(saturated.mean()),
+        "results_always_start_with_query": starts_with_query,
+        "result_count_histogram": {int(n): int(c) for n, c in enumerate(np.bincount(counts)) if c},
+        "by_depth": by_depth,
+        "prefix_counts": dict(zip(queries[detail].tolist(), counts[detail].tolist())),
+    }
+
+
+def overlap(name_arrays):
+    """Pairwise overlap between versions' sorted unique name arrays"""
+    pairs = {}
+    for a, b in combinations(sorted(name_arrays), 2):
+        shared = len(np.intersect1d(name_arrays[a], name_arrays[b], assume_unique=True))
+        union = len(name_arrays[a]) + len(name_arrays[b]) - shared
+        pairs[f"{a}/{b}"] = {
+            "shared": shared,
+            f"only_{a}": len(name_arrays[a]) - shared,
+            f"only_{b}": len(name_arrays[b]) - shared,
+            "jaccard": shared / union if union else 1.0,
+        }
+    return pairs
+
+
+def analyze(names_by_version, cache=None, max_positions=32, base_url=None):
+    """
+    Analyze extracted names (version -> iterable or file, see load_names) and,
+    if a response cache is given, every plain autocomplete response stored in it
+    (only those from base_url, when given). Costs no requests.
+    """
+    arrays = {version: name_array(load_names(source)) for version, source in names_by_version.items()}
+    report = {"versions": {}, "overlap": overlap(arrays)}
+    for version, names in arrays.items():
+        report["versions"][version] = {
+            "names": int(len(names)),
+            "lengths": length_distribution(names),
+            "position_frequencies": position_frequencies(code_points(names, max_positions)),
+        }
+    if cache is not None:
+        responses = {}
+        for version, query, params, data in cache.entries(base_url=base_url):
+            if not params:
+                responses.setdefault(version, []).append((query, data))
+        for version, entries in sorted(responses.items()):
+            report["versions"].setdefault(version, {})["responses"] = prefix_statistics(entries)
+    return report
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose refill rate adapts AIMD-style:
+    it grows by `increase` requests/second for every second of successful
+    traffic and is multiplied by `decrease` on every 429. max_rate defaults
+    to the starting rate or 100 requests/second, whichever is higher.
+    """
+    def __init__(self, rate=10.0, burst=1, min_rate=0.5, max_rate=None, increase=0.5, decrease=0.5):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max(rate, 100.0) if max_rate is None else max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:  # updated is in the future while a Retry-After pause lasts
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """
+        Take a token and return how many seconds the caller must wait before
+        using it. During a Retry-After pause, callers queue up behind its end
+        spaced one token apart, rather than all being released together.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(0.0, self.blocked_until - now) + wait
+
+    def acquire(self):
+        """Block the calling thread until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait in the event loop until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Additive increase"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease, and pause the bucket for Retry-After seconds if given"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                # No tokens accrue until the pause is over
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.updated = max(self.updated, self.blocked_until)
+
+
+class RateLimiter:
+    """
+    One TokenBucket per API version, shared by every strategy and analyzer.
+    rates optionally gives a version its own starting rate instead of initial_rate,
+    and version_options its own TokenBucket options (burst, min_rate, ...).
+    """
+    def __init__(self, initial_rate=10.0, burst=1, rates=None, version_options=None, **bucket_options):
+        self.initial_rate = initial_rate
+        self.rates = rates or {}
+        self.burst = burst
+        self.bucket_options = bucket_options
+        self.version_options = version_options or {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_profile(cls, profiles, initial_rate=10.0, **options):
+        """
+        Limiter whose per-version buckets come from a rate profile (see
+        rate_probe.py): they start at the measured rate with the measured
+        burst, may rise at most 10% above it, and take AIMD steps scaled to it
+        (in the same proportion as the defaults at 10 req/s), so a few
+        responses can't move the rate far from what was measured. Versions
+        without a measured rate use initial_rate.
+        """
+        rates = {}
+        version_options = {}
+        for version, profile in profiles.items():
+            rps = profile.get("rps")
+            if not rps:
+                continue
+            rates[version] = rps
+            version_options[version] = {
+                "burst": max(1, int(profile.get("burst") or 1)),
+                "min_rate": rps * 0.05,
+                "max_rate": rps * 1.1,
+                "increase": rps * 0.05,
+            }
+        return cls(initial_rate, rates=rates, version_options=version_options, **options)
+
+    def bucket(self, version):
+        with self.lock:
+            if version not in self.buckets:
+                rate = self.rates.get(version, self.initial_rate)
+                options = {"burst": self.burst, **self.bucket_options, **self.version_options.get(version, {})}
+                self.buckets[version] = TokenBucket(rate, **options)
+            return self.buckets[version]
+
+    def acquire(self, version):
+        self.bucket(version).acquire()
+
+    async def acquire_async(self, version):
+        await self.bucket(version).acquire_async()
+
+    def on_success(self, version):
+        self.bucket(version).on_success()
+
+    def on_throttle(self, version, retry_after=None):
+        """Record a 429; retry_after may be the raw Retry-After header value"""
+        if isinstance(retry_after, str):
+            retry_after = parse_retry_after(retry_after)
+        self.bucket(version).on_throttle(retry_after)
+
+    def current_rates(self):
+        """Current refill rate (requests/second) per version"""
+        with self.lock:
+            return {version: bucket.rate for version, bucket in self.buckets.items()}
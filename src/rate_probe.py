@@ -0,0 +1,282 @@
+import argparse
+import json
+import math
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from rate_limiter import parse_retry_after
+from response_cache import DEFAULT_TIMEOUT
+
+DEFAULT_PROFILE_PATH = "rate_profile.json"
+
+
+class RateProbe:
+    """
+    Characterizes a version's rate limit: sustainable requests/second, burst
+    size, and whether the budget comes back in fixed windows or refills
+    continuously (sliding window or token bucket).
+
+    The probe ramps a steady stream of requests until at least half are
+    throttled. While overloaded, the admitted requests show the limit directly.
+    Their rate is the sustainable rate, and the admissions before the first
+    429 are the burst. If admissions arrive back-to-back in clusters, the
+    budget resets in windows; if they arrive evenly spaced, it refills
+    continuously. A short binary search then confirms the rate by pacing
+    requests after draining the budget.
+
+    Requests are timestamped when they are actually sent, and the thread pool
+    grows with rate x latency up to max_workers. The ramp stops once the
+    requests can no longer be sent at the nominal rate.
+    """
+    def __init__(self, base_url, query="a", start_rate=50.0, max_rate=1600.0, sample_duration=3.0,
+                 trial_duration=3.0, iterations=4, max_wait=120.0, max_workers=512):
+        self.base_url = base_url
+        self.query = query
+        self.start_rate = start_rate
+        self.max_rate = max_rate
+        self.sample_duration = sample_duration
+        self.trial_duration = trial_duration
+        self.iterations = iterations
+        self.max_wait = max_wait
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        self.pool = None
+        self.workers = 0
+        self._resize(32)
+        self.latencies = []
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def _resize(self, workers):
+        """Use a pool of at least workers threads, and as many pooled connections"""
+        workers = min(workers, self.max_workers)
+        if workers <= self.workers:
+            return
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.workers = workers
+
+    def _size_for(self, rate):
+        """Grow the pool to keep rate requests/second in flight at the latency measured so far"""
+        latency = statistics.median(self.latencies) if self.latencies else 0.1
+        self._resize(math.ceil(rate * latency * 2) + 4)
+
+    def _get(self, version):
+        """
+        One request; returns (status code or None on a network error,
+        Retry-After seconds, monotonic time it was sent)
+        """
+        sent = time.monotonic()
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}/{version}/autocomplete", params={"query": self.query},
+                                        timeout=DEFAULT_TIMEOUT)
+        except requests.exceptions.RequestException:
+            return None, None, sent
+        with self.lock:
+            self.request_count += 1
+        if response.status_code == 200:
+            self.latencies.append(time.perf_counter() - start)
+        return response.status_code, parse_retry_after(response.headers.get("Retry-After")), sent
+
+    def _fire(self, version, delays):
+        """
+        Schedule one request at each delay (seconds from now); returns their
+        (status, retry_after, seconds from now they were actually sent)
+        """
+        start = time.monotonic()
+        futures = []
+        for delay in delays:
+            wait = start + delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            futures.append(self.pool.submit(self._get, version))
+        return [(status, retry_after, sent - start) for status, retry_after, sent in (f.result() for f in futures)]
+
+    def _sample(self, version, rate, duration):
+        """Send requests evenly at rate for duration seconds; returns (send offset, status) pairs sorted by offset"""
+        self._size_for(rate)
+        delays = [i / rate for i in range(int(rate * duration))]
+        return sorted((offset, status) for status, _, offset in self._fire(version, delays))
+
+    @staticmethod
+    def _achieved(timeline):
+        """Rate the requests of a timeline actually went out at"""
+        span = timeline[-1][0] - timeline[0][0]
+        return (len(timeline) - 1) / span if span > 0 else float("inf")
+
+    def _wait_for_reset(self, version, poll_interval):
+        """Poll until a request is admitted again; returns the time that took, or None"""
+        start = time.monotonic()
+        while time.monotonic() - start < self.max_wait:
+            status, retry_after, _ = self._get(version)
+            if status == 200:
+                return time.monotonic() - start
+            time.sleep(max(poll_interval, min(retry_after or 0, self.max_wait)))
+        return None
+
+    def _trial(self, version, rate, burst):
+        """Drain the budget, then pace requests at rate; passes if none are throttled"""
+        self._size_for(rate)
+        results = self._fire(version, [0] * (burst + 1))
+        retry_after = max((value or 0 for status, value, _ in results if status == 429), default=0)
+        if retry_after > 1 / rate:
+            time.sleep(retry_after - 1 / rate)
+        count = max(3, int(rate * self.trial_duration))
+        results = self._fire(version, [(i + 1) / rate for i in range(count)])
+        return all(status == 200 for status, _, _ in results)
+
+    def probe(self, version):
+        """Measure one version and return its profile"""
+        print(f"\nProbing the rate limit of {version}...")
+        self.latencies = []
+        start_count = self.request_count
+
+        # Ramp until the stream is clearly over the limit
+        rate = self.start_rate
+        burst_sample = None  # The first throttled sample started with the fullest budget
+        previous = None  # The last sample sent at its nominal rate
+        while True:
+            started = time.monotonic()
+            timeline = self._sample(version, rate, self.sample_duration)
+            throttled = [offset for offset, status in timeline if status == 429]
+            achieved = self._achieved(timeline)
+            print(f"- {rate:.0f} req/s (sent at {achieved:.0f}): {len(throttled)}/{len(timeline)} throttled")
+            if achieved < 0.9 * rate:
+                # Requests sent late bunch up, so this timeline no longer shows how admissions are spaced
+                print(f"Could only send {achieved:.0f} of {rate:.0f} req/s; stopping the ramp")
+                if previous is not None and previous[1]:
+                    timeline, throttled, rate, achieved = previous
+                    break
+                if not throttled:
+                    print(f"No throttling up to {achieved:.0f} req/s; {version}'s limit is above what the probe can send")
+                    return self._profile(version, None, None, None, None, start_count)
+            if throttled and burst_sample is None:
+                burst_sample, burst_started = timeline, started
+            if len(throttled) >= len(timeline) / 2 or achieved < 0.9 * rate:
+                break
+            previous = (timeline, throttled, rate, achieved)
+            if rate * 2 > self.max_rate:
+                if not throttled:
+                    print(f"No throttling up to {rate:.0f} req/s; {version} looks unlimited at this scale")
+                    return self._profile(version, None, None, None, None, start_count)
+                break
+            rate *= 2
+
+        admitted = [offset for offset, status in timeline if status == 200]
+        first = throttled[0]
+        initial = sum(1 for offset in admitted if offset < first)
+        burst_first = next(offset for offset, status in burst_sample if status == 429)
+        burst_initial = sum(1 for offset, status in burst_sample if status == 200 and offset < burst_first)
+        steady = [offset for offset in admitted if offset > first]
+        slot = 1 / min(rate, achieved)
+
+        if len(steady) < 2:
+            # The window is longer than the sample: wait for the reset and see how much comes back.
+            # The budget may have run out in an earlier ramp step, leaving nothing admitted in this
+            # one, so the burst and the start of the wait are taken from the first throttled sample.
+            burst = burst_initial
+            if self._wait_for_reset(version, slot) is None:
+                print(f"{version} did not recover within {self.max_wait}s")
+                return self._profile(version, None, burst, None, None, start_count)
+            reset_at = time.monotonic()
+            window = reset_at - (burst_started + burst_first)
+            refill = 1 + sum(1 for status, _ in self._fire(version, [0] * burst) if status == 200)
+            kind = "fixed" if refill >= max(2, burst / 2) else "sliding"
+            if kind == "fixed":
+                # The refill used up the new window, so the next reset times it exactly
+                if self._wait_for_reset(version, slot) is not None:
+                    window = time.monotonic() - reset_at
+            estimate = burst / window
+        else:
+            estimate = len(steady) / (timeline[-1][0] - first)
+            gaps = [b - a for a, b in zip(steady, steady[1:])]
+            back_to_back = sum(1 for gap in gaps if gap < 1.5 * slot)
+            if back_to_back > len(gaps) / 2:
+                # Admissions come in clusters: the budget resets all at once
+                kind = "fixed"
+                clusters = 1 + sum(1 for gap in gaps if gap >= 1.5 * slot)
+                burst = round(len(steady) / clusters)
+                window = burst / estimate
+            else:
+                kind = "sliding"
+                burst = max(1, round(burst_initial - estimate * burst_first))
+                window = burst / estimate
+        print(f"Overloaded at {min(rate, achieved):.0f} req/s: {estimate:.2f} req/s admitted, initial burst {initial}, {kind} window")
+        if estimate <= 0 or burst <= 0:
+            print(f"Could not measure a rate for {version}")
+            return self._profile(version, None, None, None, None, start_count)
+
+        if kind == "fixed" and window > self.trial_duration:
+            # A paced trial shorter than the window can't exceed its budget, so it can't confirm anything
+            return self._profile(version, estimate, burst, kind, window, start_count)
+
+        # Confirm by pacing just below and around the estimate
+        low, high = estimate / 2, estimate * 1.1
+        for _ in range(self.iterations):
+            candidate = math.sqrt(low * high)
+            passed = self._trial(version, candidate, burst)
+            print(f"- paced at {candidate:.2f} req/s: {'ok' if passed else 'throttled'}")
+            if passed:
+                low = candidate
+            else:
+                high = candidate
+        return self._profile(version, low, burst, kind, window, start_count)
+
+    def _profile(self, version, rps, burst, window, window_seconds, start_count):
+        latency = statistics.median(self.latencies) if self.latencies else None
+        profile = {
+            "rps": rps,
+            "burst": burst,
+            "window": window,
+            "window_seconds": window_seconds,
+            "latency": latency,
+            # Little's law: connections needed to keep rps requests in flight
+            "concurrency": max(1, math.ceil(rps * latency) + 1) if rps and latency else None,
+            "probe_requests": self.request_count - start_count,
+            "probed_at": time.time(),
+        }
+        print(f"{version}: {rps and f'{rps:.2f}'} req/s, burst {burst}, {window} window"
+              f"{f' of {window_seconds:.2f}s' if window_seconds else ''}")
+        return profile
+
+    def run(self, versions=("v1", "v2", "v3"), path=DEFAULT_PROFILE_PATH):
+        """Probe versions and save their profiles"""
+        profiles = {version: self.probe(version) for version in versions}
+        save_profile(profiles, path)
+        print(f"\nSaved rate limit profile to {path}")
+        return profiles
+
+
+def save_profile(profiles, path=DEFAULT_PROFILE_PATH):
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=2)
+
+
+def load_profile(path=DEFAULT_PROFILE_PATH):
+    """Version -> profile, as saved by RateProbe.run"""
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure each version's rate limit and save a profile")
+    parser.add_argument("--base-url", default="http://35.200.185.69:8000")
+    parser.add_argument("--versions", nargs="+", default=["v1", "v2", "v3"])
+    parser.add_argument("--output", default=DEFAULT_PROFILE_PATH)
+    parser.add_argument("--start-rate", type=float, default=50.0, help="Requests/second the ramp starts at")
+    parser.add_argument("--max-rate", type=float, default=1600.0, help="Requests/second the ramp stops at")
+    parser.add_argument("--trial-duration", type=float, default=3.0, help="Seconds each confirmation rate is held for")
+    parser.add_argument("--iterations", type=int, default=4, help="Binary search steps")
+    args = parser.parse_args()
+
+    RateProbe(args.base_url, start_rate=args.start_rate, max_rate=args.max_rate, trial_duration=args.trial_duration,
+              iterations=args.iterations).run(args.versions, args.output)
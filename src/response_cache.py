@@ -0,0 +1,220 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = "response_cache.sqlite"
+DEFAULT_TTL = 24 * 3600  # Seconds before a cached response is considered stale
+# (connect, read) seconds for every request, so a hung connection can't stall a worker
+DEFAULT_TIMEOUT = (3.05, 10.0)
+
+
+def make_key(base_url, version, query, params=None):
+    """Cache key for an autocomplete request to the server at base_url; params are order-independent"""
+    params = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return json.dumps([base_url.rstrip("/"), version, query, params])
+
+
+class ResponseCache:
+    """
+    On-disk (SQLite) cache of successful autocomplete responses keyed on
+    (base_url, version, query, params), with a TTL, LRU eviction once max_entries is
+    exceeded, and hit/miss counters. Safe to share between threads.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=1_000_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+        if columns and "base_url" not in columns:
+            # Written before keys named the server; its responses can't be told apart, so start over
+            self.conn.execute("DROP TABLE responses")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, base_url TEXT, version TEXT, query TEXT, params TEXT, "
+            "body TEXT, created REAL, accessed REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, base_url, version, query, params=None):
+        """Return the cached response data, or None on a miss"""
+        key = make_key(base_url, version, query, params)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT body, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.size -= 1
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, base_url, version, query, data, params=None):
+        """Store response data, evicting least recently used entries if over max_entries"""
+        key = make_key(base_url, version, query, params)
+        now = time.time()
+        params_json = json.dumps(params or {}, sort_keys=True)
+        with self.lock:
+            existing = self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, base_url.rstrip("/"), version, query, params_json, json.dumps(data), now, now),
+            )
+            if existing is None:
+                self.size += 1
+            if self.size > self.max_entries:
+                # Evict in batches so eviction isn't paid on every insert
+                excess = self.size - self.max_entries + max(1, self.max_entries // 10)
+                self.conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                self.size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def entries(self, version=None, base_url=None):
+        """Yield (version, query, params, data) for every live cached response, optionally of one server"""
+        sql = "SELECT version, query, params, body, created FROM responses"
+        conditions, args = [], ()
+        if version is not None:
+            conditions.append("version = ?")
+            args += (version,)
+        if base_url is not None:
+            conditions.append("base_url = ?")
+            args += (base_url.rstrip("/"),)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        now = time.time()
+        for row_version, query, params, body, created in rows:
+            if self.ttl is None or now - created <= self.ttl:
+                yield row_version, query, json.loads(params), json.loads(body)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": self.size,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class MemoryResponseCache:
+    """In-process drop-in replacement for ResponseCache, for runs that shouldn't touch disk"""
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, base_url, version, query, params=None):
+        key = make_key(base_url, version, query, params)
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or (self.ttl is not None and time.time() - item[5] > self.ttl):
+                self.data.pop(key, None)
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[4]
+
+    def put(self, base_url, version, query, data, params=None):
+        key = make_key(base_url, version, query, params)
+        with self.lock:
+            self.data[key] = (base_url.rstrip("/"), version, query, dict(params or {}), data, time.time())
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def entries(self, version=None, base_url=None):
+        with self.lock:
+            items = list(self.data.values())
+        now = time.time()
+        for item_base_url, item_version, query, params, data, created in items:
+            if ((version is None or item_version == version)
+                    and (base_url is None or item_base_url == base_url.rstrip("/"))
+                    and (self.ttl is None or now - created <= self.ttl)):
+                yield item_version, query, params, data
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.data),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        pass
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response when a request is served from the cache"""
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+def paced(get, rate_limiter, version):
+    """
+    Wrap get(url, params=...) so every call waits for a rate token of
+    version and reports 429s and successes back to rate_limiter
+    """
+    def paced_get(url, params=None):
+        rate_limiter.acquire(version)
+        response = get(url, params=params)
+        if response.status_code == 429:
+            rate_limiter.on_throttle(version, response.headers.get("Retry-After"))
+        elif response.status_code == 200:
+            rate_limiter.on_success(version)
+        return response
+    return paced_get
+
+
+def cached_get(cache, get, base_url, version, query, params=None):
+    """
+    GET /{version}/autocomplete through the cache. `get` performs the real
+    request (requests.get, a session's get, or a paced wrapper) and is only
+    called on a miss; successful JSON responses are stored.
+    """
+    if cache is not None:
+        data = cache.get(base_url, version, query, params)
+        if data is not None:
+            return CachedResponse(data)
+
+    response = get(f"{base_url}/{version}/autocomplete", params={"query": query, **(params or {})})
+    if cache is not None and response.status_code == 200:
+        try:
+            cache.put(base_url, version, query, response.json(), params)
+        except ValueError:
+            pass
+    return response
@@ -1,14 +1,29 @@
+import os
 import requests
+import sys
 import time
 import string
 import json
 from collections import Counter
+from functools import partial
+from rate_limiter import RateLimiter
+from response_cache import DEFAULT_TIMEOUT, ResponseCache, cached_get, paced
 
 class APIResponseAnalyzer:
-    def __init__(self, base_url="http://35.200.185.69:8000"):
+    def __init__(self, base_url="http://35.200.185.69:8000", rate_limiter=None, cache=None):
         self.base_url = base_url
         self.versions = ["v1", "v2", "v3"]
         self.rate_limit_wait = 0.2
+        self.rate_limiter = rate_limiter or RateLimiter(initial_rate=1 / self.rate_limit_wait)
+        self.timeout = DEFAULT_TIMEOUT
+        if cache is None:
+            cache = ResponseCache()
+        self.cache = cache or None  # Pass cache=False to always hit the network
+        
+    def get(self, version, query, params=None):
+        """Autocomplete request read through the response cache, paced by the shared rate limiter"""
+        get = paced(partial(requests.get, timeout=self.timeout), self.rate_limiter, version)
+        return cached_get(self.cache, get, self.base_url, version, query, params)
         
     def analyze_response_patterns(self, version):
         """Analyze patterns in API responses for a given version"""
@@ -17,9 +32,8 @@ class APIResponseAnalyzer:
         # Test single character queries
         single_char_stats = {}
         for char in string.ascii_lowercase:
-            url = f"{self.base_url}/{version}/autocomplete?query={char}"
             try:
-                response = requests.get(url)
+                response = self.get(version, char)
                 if response.status_code == 200:
                     data = response.json()
                     if isinstance(data, list):
@@ -28,7 +42,6 @@ class APIResponseAnalyzer:
                             "starts_with_query": sum(1 for name in data if name.lower().startswith(char)),
                             "name_lengths": Counter([len(name) for name in data])
                         }
-                time.sleep(self.rate_limit_wait)
             except Exception as e:
                 print(f"Error analyzing {char}: {e}")
         
@@ -37,9 +50,8 @@ class APIResponseAnalyzer:
         test_prefixes = ["aa", "ab", "ba", "ca", "ma", "za"]
         
         for prefix in test_prefixes:
-            url = f"{self.base_url}/{version}/autocomplete?query={prefix}"
             try:
-                response = requests.get(url)
+                response = self.get(version, prefix)
                 if response.status_code == 200:
                     data = response.json()
                     if isinstance(data, list):
@@ -48,7 +60,6 @@ class APIResponseAnalyzer:
                             "starts_with_query": sum(1 for name in data if name.lower().startswith(prefix)),
                             "name_lengths": Counter([len(name) for name in data])
                         }
-                time.sleep(self.rate_limit_wait)
             except Exception as e:
                 print(f"Error analyzing {prefix}: {e}")
         
@@ -64,10 +75,9 @@ class APIResponseAnalyzer:
         
         for params in test_params:
             param_str = "&".join([f"{k}={v}" for k, v in params.items()])
-            url = f"{self.base_url}/{version}/autocomplete?query=a&{param_str}"
             
             try:
-                response = requests.get(url)
+                response = self.get(version, "a", params)
                 if response.status_code == 200:
                     data = response.json()
                     if isinstance(data, list):
@@ -75,7 +85,6 @@ class APIResponseAnalyzer:
                             "status": response.status_code,
                             "count": len(data)
                         }
-                time.sleep(self.rate_limit_wait)
             except Exception as e:
                 print(f"Error testing pagination {param_str}: {e}")
         
@@ -112,14 +121,55 @@ class APIResponseAnalyzer:
             "avg_results_per_char": avg_results
         }
     
-    def run_analysis(self):
-        """Run analysis on all valid versions"""
+    def analyze_offline(self, name_sources=None, output="api_offline_analysis.json"):
+        """
+        Analyze cached responses and extracted names without making any requests.
+        name_sources maps version -> names or a names file; by default each
+        version's {version}_names.json (or .ndjson stream) is used when present.
+        """
+        print("\nAnalyzing cached responses and extracted names offline...")
+        if name_sources is None:
+            name_sources = {}
+            for version in self.versions:
+                for path in (f"{version}_names.json", f"{version}_names.ndjson"):
+                    if os.path.exists(path):
+                        name_sources[version] = path
+                        break
+        
+        start = time.perf_counter()
+        from offline_analysis import analyze  # Needs NumPy, which live analysis doesn't
+        report = analyze(name_sources, self.cache, base_url=self.base_url)
+        
+        for version, stats in report["versions"].items():
+            print(f"\n{version}:")
+            if "lengths" in stats:
+                lengths = stats["lengths"]
+                print(f"- Names: {stats['names']}, length mean {lengths.get('mean', 0):.1f}, "
+                      f"range {lengths.get('min', 0)}-{lengths.get('max', 0)}")
+            responses = stats.get("responses")
+            if responses and responses["prefixes"]:
+                print(f"- Cached responses: {responses['prefixes']}, result cap {responses['result_cap']}, "
+                      f"saturation rate {responses['saturation_rate']:.1%}")
+                print(f"- Results always start with query: {responses['results_always_start_with_query']}")
+        for pair, stats in report["overlap"].items():
+            print(f"Overlap {pair}: {stats['shared']} shared, Jaccard {stats['jaccard']:.3f}")
+        
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nOffline analysis done in {time.perf_counter() - start:.2f}s. Results saved to {output}")
+        return report
+    
+    def run_analysis(self, offline=False):
+        """Run analysis on all valid versions; offline=True analyzes stored data instead (see analyze_offline)"""
+        if offline:
+            return self.analyze_offline()
+        
         results = {}
         
         for version in self.versions:
             # First check if version exists
             try:
-                response = requests.get(f"{self.base_url}/{version}/autocomplete?query=a")
+                response = self.get(version, "a")
                 if response.status_code == 200:
                     results[version] = self.analyze_response_patterns(version)
             except Exception as e:
@@ -132,6 +182,7 @@ class APIResponseAnalyzer:
         print("\nAnalysis complete. Results saved to api_analysis_results.json")
         return results
 
-# Run the analysis
-analyzer = APIResponseAnalyzer()
-analysis_results = analyzer.run_analysis()
\ No newline at end of file
+if __name__ == "__main__":
+    # Run the analysis
+    analyzer = APIResponseAnalyzer()
+    analysis_results = analyzer.run_analysis(offline="--offline" in sys.argv)
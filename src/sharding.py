@@ -0,0 +1,257 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import string
+import threading
+import time
+
+from crawl import AlphabetModel
+from extractor import AutocompleteAPIExtractor
+from name_store import NameStore, write_json_list
+from rate_limiter import RateLimiter
+
+# A work directory holds one file per work unit, moved between these
+# subdirectories with os.rename, which is atomic on a single filesystem.
+# Workers on other machines can share it over a network filesystem.
+PENDING, CLAIMED, DONE = "pending", "claimed", "done"
+CATCH_ALL = "catchall"  # The unit for names outside every other unit, e.g. starting with a digit
+HEARTBEAT_INTERVAL = 60  # Seconds between touches of a claim file; keep requeue's older_than well above it
+
+
+def _write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def unit_prefixes(alphabet, unit_depth):
+    return ["".join(chars) for chars in itertools.product(alphabet, repeat=unit_depth)]
+
+
+def init_work_dir(work_dir, version, unit_depth=1, alphabet=string.ascii_lowercase, result_cap=None):
+    """
+    Partition the prefix space into one work unit per prefix of length
+    unit_depth over alphabet, plus a catch-all unit for every prefix outside
+    them (see run_catch_all)
+    """
+    for subdir in (PENDING, CLAIMED, DONE):
+        os.makedirs(os.path.join(work_dir, subdir), exist_ok=True)
+
+    prefixes = unit_prefixes(alphabet, unit_depth)
+    for index, prefix in enumerate(prefixes):
+        unit = {"index": index, "prefix": prefix, "version": version, "result_cap": result_cap}
+        _write_json(os.path.join(work_dir, PENDING, f"{index:06d}.json"), unit)
+    _write_json(os.path.join(work_dir, PENDING, f"{CATCH_ALL}.json"), {
+        "index": len(prefixes), "prefix": None, "version": version, "result_cap": result_cap,
+        "alphabet": alphabet, "unit_depth": unit_depth,
+    })
+    print(f"Created {len(prefixes) + 1} work units for {version} in {work_dir}")
+    return len(prefixes) + 1
+
+
+def claim_unit(work_dir, worker_id):
+    """
+    Atomically claim the next pending unit, or return None when none are left.
+    The catch-all unit is only handed out once every other unit is done, so
+    it can learn the alphabet from all of their names.
+    """
+    pending_dir = os.path.join(work_dir, PENDING)
+    for filename in sorted(os.listdir(pending_dir)):  # Numbered units sort before the catch-all
+        if not filename.endswith(".json"):
+            continue
+        if filename == f"{CATCH_ALL}.json" and os.listdir(os.path.join(work_dir, CLAIMED)):
+            continue
+        claimed_path = os.path.join(work_dir, CLAIMED, f"{filename[:-5]}.{worker_id}.json")
+        try:
+            os.rename(os.path.join(pending_dir, filename), claimed_path)
+        except FileNotFoundError:
+            continue  # Another worker got it first
+        os.utime(claimed_path)  # Claim time, for requeue_stale
+        with open(claimed_path) as f:
+            return json.load(f), claimed_path
+    return None
+
+
+def requeue_stale(work_dir, older_than=600):
+    """Move units claimed more than older_than seconds ago back to pending (e.g. after a worker crash)"""
+    claimed_dir = os.path.join(work_dir, CLAIMED)
+    requeued = 0
+    for filename in os.listdir(claimed_dir):
+        path = os.path.join(claimed_dir, filename)
+        if time.time() - os.path.getmtime(path) > older_than:
+            index = filename.split(".", 1)[0]
+            with contextlib.suppress(FileNotFoundError):
+                os.rename(path, os.path.join(work_dir, PENDING, f"{index}.json"))
+                requeued += 1
+    print(f"Requeued {requeued} stale work units")
+    return requeued
+
+
+def _heartbeat(path, stop):
+    """Touch a claim file until stop is set, so requeue_stale leaves long-running units alone"""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+
+
+def run_catch_all(extractor, work_dir, unit):
+    """
+    Crawl every prefix outside the numbered units. The alphabet is learned
+    from the names of the finished units, and the crawl adds roots for any
+    character found along the way, e.g. names starting with a digit or dot.
+    """
+    version = unit["version"]
+    model = extractor.alphabet_models[version] = AlphabetModel(unit["alphabet"])
+    done_dir = os.path.join(work_dir, DONE)
+    for filename in sorted(os.listdir(done_dir)):
+        if filename.endswith(".json"):
+            with open(os.path.join(done_dir, filename)) as f:
+                model.observe(json.load(f)["names"])
+    exclude = set(unit_prefixes(unit["alphabet"], unit["unit_depth"]))
+    return extractor.saturation_approach(version, result_cap=unit["result_cap"], exclude=exclude)
+
+
+def run_worker(work_dir, base_url, worker_id=None, rate=10.0, concurrency=5, quiet=True):
+    """
+    Claim and crawl work units until none are left. Each worker has its own
+    rate limiter, so workers behind different egress IPs get separate budgets.
+    While a unit runs, its claim file is touched every HEARTBEAT_INTERVAL
+    seconds so it isn't mistaken for a crashed worker's.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    extractor = AutocompleteAPIExtractor(base_url, rate_limiter=RateLimiter(initial_rate=rate), cache=False)
+    extractor.max_concurrency = concurrency
+    completed = 0
+
+    while True:
+        claim = claim_unit(work_dir, worker_id)
+        if claim is None:
+            break
+        unit, claimed_path = claim
+        version = unit["version"]
+        extractor.results[version] = NameStore()
+        requests_before = extractor.request_count[version]
+        start = time.time()
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(claimed_path, stop), daemon=True)
+        heartbeat.start()
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                if unit["prefix"] is None:
+                    names = run_catch_all(extractor, work_dir, unit)
+                else:
+                    names = extractor.saturation_approach(version, result_cap=unit["result_cap"], seeds=[unit["prefix"]])
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        _write_json(os.path.join(work_dir, DONE, f"{unit['index']:06d}.json"), {
+            **unit,
+            "worker": worker_id,
+            "names": list(names),
+            "requests": extractor.request_count[version] - requests_before,
+            "elapsed": time.time() - start,
+        })
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(claimed_path)  # Gone if the unit was requeued as stale meanwhile
+        completed += 1
+        print(f"[{worker_id}] Unit '{unit['prefix'] or CATCH_ALL}' done: {len(names)} names, "
+              f"{extractor.request_count[version] - requests_before} requests")
+
+    return completed
+
+
+def run_local(work_dir, base_urls, workers=4, rate=10.0, concurrency=5):
+    """Run a pool of worker processes on this machine; base_urls are assigned round-robin"""
+    processes = []
+    for i in range(workers):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(work_dir, base_urls[i % len(base_urls)], f"{socket.gethostname()}-w{i}", rate, concurrency),
+        )
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+
+
+def merge_shards(work_dir, output_dir="."):
+    """
+    Merge finished units in unit order into {version}_names.json and
+    {version}_shard_stats.json. The output only depends on the units, not
+    on which worker ran them or when.
+    """
+    done_dir = os.path.join(work_dir, DONE)
+    stores = {}
+    stats = {}
+    for filename in sorted(os.listdir(done_dir)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(done_dir, filename)) as f:
+            unit = json.load(f)
+        version = unit["version"]
+        store = stores.setdefault(version, NameStore())
+        new_names = store.add_many(unit["names"])
+        version_stats = stats.setdefault(version, {"units": 0, "requests": 0, "names": 0, "duplicates": 0, "workers": {}})
+        version_stats["units"] += 1
+        version_stats["requests"] += unit["requests"]
+        version_stats["names"] = len(store)
+        version_stats["duplicates"] += len(unit["names"]) - len(new_names)
+        worker = version_stats["workers"].setdefault(unit["worker"], {"units": 0, "requests": 0, "elapsed": 0.0})
+        worker["units"] += 1
+        worker["requests"] += unit["requests"]
+        worker["elapsed"] += unit["elapsed"]
+
+    pending = len([name for name in os.listdir(os.path.join(work_dir, PENDING)) if name.endswith(".json")])
+    claimed = len(os.listdir(os.path.join(work_dir, CLAIMED)))
+    for version, store in stores.items():
+        write_json_list(store, os.path.join(output_dir, f"{version}_names.json"))
+        stats[version]["workers"] = dict(sorted(stats[version]["workers"].items()))
+        stats[version]["incomplete_units"] = pending + claimed
+        with open(os.path.join(output_dir, f"{version}_shard_stats.json"), "w") as f:
+            json.dump(stats[version], f, indent=2)
+        print(f"{version}: merged {stats[version]['units']} units, {len(store)} names, "
+              f"{stats[version]['requests']} requests ({pending + claimed} units still incomplete)")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded extraction over a file-based work queue")
+    parser.add_argument("command", choices=["init", "worker", "run", "merge", "requeue"])
+    parser.add_argument("--work-dir", default="shards")
+    parser.add_argument("--version", default="v1", choices=["v1", "v2", "v3"])
+    parser.add_argument("--unit-depth", type=int, default=1, help="Prefix length of each work unit")
+    parser.add_argument("--alphabet", default=string.ascii_lowercase,
+                        help="Characters work units are made from; the catch-all unit covers the rest")
+    parser.add_argument("--result-cap", type=int, help="Known server result cap, instead of detecting it per worker")
+    parser.add_argument("--base-url", action="append", help="API base URL (repeat to spread local workers)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker-id")
+    parser.add_argument("--rate", type=float, default=10.0, help="Initial requests/second per worker")
+    parser.add_argument("--concurrency", type=int, default=5, help="Open connections per worker")
+    parser.add_argument("--older-than", type=float, default=600, help="Seconds before a claim counts as stale")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+    base_urls = args.base_url or ["http://35.200.185.69:8000"]
+
+    if args.command == "init":
+        init_work_dir(args.work_dir, args.version, args.unit_depth, args.alphabet, args.result_cap)
+    elif args.command == "worker":
+        run_worker(args.work_dir, base_urls[0], args.worker_id, args.rate, args.concurrency)
+    elif args.command == "run":
+        if not os.path.isdir(os.path.join(args.work_dir, PENDING)):
+            init_work_dir(args.work_dir, args.version, args.unit_depth, args.alphabet, args.result_cap)
+        run_local(args.work_dir, base_urls, args.workers, args.rate, args.concurrency)
+        merge_shards(args.work_dir, args.output_dir)
+    elif args.command == "merge":
+        merge_shards(args.work_dir, args.output_dir)
+    elif args.command == "requeue":
+        requeue_stale(args.work_dir, args.older_than)
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from collections import Counter
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: while a call for a key is running,
+    other callers with the same key wait for it and share its result instead
+    of making their own. Threads share calls through do(), coroutines on one
+    event loop through do_async(). Keys are tuples whose first item is the
+    API version, which is used to count saved calls per version.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.async_calls = {}
+        self.saved = Counter()
+
+    def do(self, key, fn):
+        """Run fn() unless an identical call is already in flight, in which case wait for its result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.saved[key[0]] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    async def do_async(self, key, coro_fn):
+        """Await coro_fn() unless an identical call is already in flight, in which case await its result"""
+        future = self.async_calls.get(key)
+        if future is not None:
+            with self.lock:
+                self.saved[key[0]] += 1
+            return await asyncio.shield(future)
+
+        future = self.async_calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await coro_fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so a failure with no followers isn't logged
+            raise
+        finally:
+            del self.async_calls[key]
+
+    def total_saved(self):
+        with self.lock:
+            return sum(self.saved.values())
@@ -1,9 +1,19 @@
 import requests
-import time
 import string
 import json
+from functools import partial
+from rate_limiter import RateLimiter
+from rate_probe import RateProbe
+from response_cache import DEFAULT_TIMEOUT, ResponseCache, cached_get, paced
 
 base_url = "http://35.200.185.69:8000"
+rate_limiter = RateLimiter(initial_rate=2)  # Paces everything except the rate limit test itself
+cache = None  # Response cache, opened when run as a script
+
+def paced_get(version, query, params=None):
+    """Autocomplete request read through the response cache and the shared rate limiter"""
+    get = paced(partial(requests.get, timeout=DEFAULT_TIMEOUT), rate_limiter, version)
+    return cached_get(cache, get, base_url, version, query, params)
 
 def test_api_behavior():
     """
@@ -17,7 +27,7 @@ def test_api_behavior():
     
     for version in versions:
         try:
-            response = requests.get(f"{base_url}/{version}/autocomplete?query=a")
+            response = paced_get(version, "a")
             if response.status_code == 200:
                 version_support[version] = "Supported"
                 version_support[f"{version}_sample"] = response.json()
@@ -32,38 +42,27 @@ def test_api_behavior():
     query_length = {}
     for length in range(5):
         query = "a" * length
-        response = requests.get(f"{base_url}/v1/autocomplete?query={query}")
+        response = paced_get("v1", query)
         query_length[length] = {
             "status_code": response.status_code,
             "response": response.json() if response.status_code == 200 else None
         }
-        time.sleep(0.5)  # Avoid potential rate limiting
         
     findings["query_length_requirements"] = query_length
     
-    # 3. Test rate limiting
-    rate_limit = {}
-    for i in range(10):
-        start_time = time.time()
-        response = requests.get(f"{base_url}/v1/autocomplete?query=a")
-        rate_limit[i] = {
-            "status_code": response.status_code,
-            "time": time.time() - start_time
-        }
-        
-    findings["rate_limit_test"] = rate_limit
+    # 3. Test rate limiting: sustainable rate, burst and window type (rate_probe.py saves these for all versions)
+    findings["rate_limit_test"] = RateProbe(base_url).probe("v1")
     
     # 4. Test different characters
     char_test = {}
     for char in string.ascii_lowercase[:5]:  # Test first 5 letters
-        response = requests.get(f"{base_url}/v1/autocomplete?query={char}")
+        response = paced_get("v1", char)
         if response.status_code == 200:
             results = response.json()
             char_test[char] = {
                 "count": len(results) if isinstance(results, list) else "Not a list",
                 "sample": results[:3] if isinstance(results, list) and results else "Empty"
             }
-        time.sleep(0.5)
         
     findings["character_test"] = char_test
     
@@ -72,17 +71,18 @@ def test_api_behavior():
     potential_params = ["limit", "offset", "max", "page", "start"]
     
     for param in potential_params:
-        response = requests.get(f"{base_url}/v1/autocomplete?query=a&{param}=10")
+        response = paced_get("v1", "a", {param: 10})
         params_test[param] = {
             "status_code": response.status_code,
             "different_from_base": response.json() != findings["version_support"]["v1_sample"] if response.status_code == 200 else "N/A"
         }
-        time.sleep(0.5)
         
     findings["additional_params"] = params_test
     
     return findings
 
-# Run the behavior analysis
-behavior_findings = test_api_behavior()
-print(json.dumps(behavior_findings, indent=2))
\ No newline at end of file
+if __name__ == "__main__":
+    # Run the behavior analysis
+    cache = ResponseCache()
+    behavior_findings = test_api_behavior()
+    print(json.dumps(behavior_findings, indent=2))
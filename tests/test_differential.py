@@ -0,0 +1,18 @@
+import json
+
+from extractor import main
+from mock_server import MockAutocompleteServer, generate_corpus
+
+
+def test_differential_run_recovers_every_version(tmp_path, monkeypatch):
+    """--differential crawls v2 and v3 by diffing against the version before them"""
+    corpus = generate_corpus(1000)
+    monkeypatch.chdir(tmp_path)
+    with MockAutocompleteServer(corpus, latency=0, jitter=0) as server:
+        main(["--base-url", server.base_url, "--differential", "--metrics-interval", "0"])
+        requests = dict(server.request_count)
+    for version in ("v1", "v2", "v3"):
+        with open(tmp_path / f"{version}_names.json", encoding="utf-8") as f:
+            assert sorted(json.load(f)) == corpus
+    # Diffing an unchanged version costs a fraction of crawling it from scratch
+    assert requests["v2"] < requests["v1"] / 2